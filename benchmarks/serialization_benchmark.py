@@ -0,0 +1,62 @@
+#!/usr/bin/env python
+# -*-coding:utf-8 -*-
+'''
+@File      :    serialization_benchmark.py
+@Time      :    2023/07/08
+@Author    :    Feiyu Zheng
+@Version   :    1.0
+@Contact   :    feiyuzheng98@gmail.com
+@License   :    Copyright (c) 2023-present Feiyu Zheng. All rights reserved.
+                This work is licensed under the terms of the MIT license.
+                For a copy, see <https://opensource.org/licenses/MIT>.
+@Desc      :    Compare dump time, load time and file size of the data file serialization types.
+                Run from the repository root: python benchmarks/serialization_benchmark.py
+'''
+
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.realpath(__file__)), '..', 'src'))
+
+from utils import io_utils
+
+SIZES = (1_000, 10_000, 100_000)
+REPEAT = 5
+
+def generate_scores(size: int) -> dict:
+    # discord user ids mapped to history scores
+    return {random.randrange(10 ** 17, 10 ** 19): random.randrange(0, 1000) for _ in range(size)}
+
+def measure(func, repeat: int = REPEAT) -> float:
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def main():
+    formats = {
+        'json (indent=4)': ('.json', lambda data, path: io_utils.atomic_write(path, json.dumps(data, indent=4).encode('utf-8'))),
+        'json': ('.json', lambda data, path: io_utils.dump_data(data, path)),
+        'pkl': ('.pkl', lambda data, path: io_utils.dump_data(data, path)),
+    }
+    if io_utils.msgpack is not None:
+        formats['msgpack'] = ('.msgpack', lambda data, path: io_utils.dump_data(data, path))
+    print(f"orjson: {'yes' if io_utils.orjson is not None else 'no'}, msgpack: {'yes' if io_utils.msgpack is not None else 'no'}")
+    print(f"{'entries':>8} {'format':<16} {'dump (ms)':>10} {'load (ms)':>10} {'size (KB)':>10}")
+    with tempfile.TemporaryDirectory() as dir_path:
+        for size in SIZES:
+            data = generate_scores(size)
+            for name, (ext, dump) in formats.items():
+                path = os.path.join(dir_path, f'scores{ext}')
+                dump_time = measure(lambda: dump(data, path))
+                load_time = measure(lambda: io_utils.load_data(path))
+                print(f"{size:>8} {name:<16} {dump_time * 1000:>10.2f} {load_time * 1000:>10.2f} {os.path.getsize(path) / 1024:>10.1f}")
+
+if __name__ == '__main__':
+    main()
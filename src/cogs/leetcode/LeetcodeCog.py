@@ -20,6 +20,7 @@ from discord.ext import commands
 from pytz import all_timezones
 
 from cogs.leetcode.lib.Leetcode import Leetcode
+from utils.discord_utils import is_owner
 
 class LeetcodeCog(commands.Cog, name='leetcode'):
     def __init__(
@@ -151,6 +152,12 @@ class LeetcodeCog(commands.Cog, name='leetcode'):
 
         self.add_command()
 
+    async def cog_load(self) -> None:
+        await self.leetcode_module.setup()
+
+    async def cog_unload(self) -> None:
+        await self.leetcode_module.close()
+
     def add_command(self):
 
         @self.bot.hybrid_group(
@@ -174,8 +181,11 @@ class LeetcodeCog(commands.Cog, name='leetcode'):
                     "\n\t[question|q] <question_id> - Show the leetcode question with the specific question id." + 
                     "\n\tget_submission <submission_id> - Get the submission result with the specific submission id." +
                     '\n\tinfo - Show the leetcode module information.' + 
+                    '\n\tscheduler - Show the scheduled phase metrics (owner only).' + 
                     '\n\tsubmit <url> - Submit the leetcode solution.' +
-                    '\n\tset <option> <value> - Set the leetcode module option.',
+                    '\n\tset <option> <value> - Set the leetcode module option.' +
+                    '\n\tset reminder <hour> [minute] [timezone] [delivery] - Set your personal reminder.' +
+                    '\n\tset clear_reminder - Remove your personal reminder.',
         )
         async def leetcode(ctx: commands.Context) -> None:
             if ctx.invoked_subcommand is None:
@@ -322,7 +332,7 @@ class LeetcodeCog(commands.Cog, name='leetcode'):
             description='show today\'s leetcode problem.'
         )
         async def today(ctx: commands.Context, use_cache: bool=True) -> None:
-            await ctx.send(embed=self.leetcode_module.get_daily_coding_challenge(use_cache), ephemeral=True)
+            await ctx.send(embed=await self.leetcode_module.get_daily_coding_challenge(use_cache), ephemeral=True)
 
         @leetcode.command(
             name='question',
@@ -331,7 +341,7 @@ class LeetcodeCog(commands.Cog, name='leetcode'):
             description='show the leetcode question with the specific question id.'
         )
         async def question(ctx : commands.Context, question_id: int) -> None:
-            await ctx.send(embed=self.leetcode_module.get_question_by_id(question_id))
+            await ctx.send(embed=await self.leetcode_module.get_question_by_id(question_id))
 
         @leetcode.command(
             name='get_submission',
@@ -339,7 +349,7 @@ class LeetcodeCog(commands.Cog, name='leetcode'):
             description='get the leetcode submission with the specific submission id.'
         )
         async def get_submission(ctx : commands.Context, submission_id: int) -> None:
-            await ctx.send(embed=self.leetcode_module.get_submission(ctx.guild, submission_id))
+            await ctx.send(embed=await self.leetcode_module.get_submission(ctx.guild, submission_id))
 
         @leetcode.command(
             name='info',
@@ -349,6 +359,17 @@ class LeetcodeCog(commands.Cog, name='leetcode'):
         async def info(ctx : commands.Context) -> None:
             await ctx.send(self.leetcode_module.get_info(ctx.guild))
 
+        @leetcode.command(
+            name='scheduler',
+            brief='scheduler command.',
+            description='show the lag, duration and failures of the scheduled phases.'
+        )
+        @is_owner(self.bot.config['owners'])
+        async def scheduler(ctx : commands.Context) -> None:
+            await ctx.defer(ephemeral=True)
+            await self.leetcode_module.dump_scheduler_metrics()
+            await ctx.send(self.leetcode_module.get_scheduler_stats(), ephemeral=True)
+
         @leetcode.command(
             name='submit',
             brief='submit command.',
@@ -356,7 +377,7 @@ class LeetcodeCog(commands.Cog, name='leetcode'):
         )
         async def submit(ctx : commands.Context, url: str) -> None:
             await ctx.defer(ephemeral=True)
-            user_message, user_embed, log_message = self.leetcode_module.submit_solution(ctx.guild, ctx.author, url)
+            user_message, user_embed, log_message = await self.leetcode_module.submit_solution(ctx.guild, ctx.author, url)
             self.bot.logger.info(log_message)
             await ctx.send(user_message, ephemeral=True)
             if user_embed is not None:
@@ -425,6 +446,39 @@ class LeetcodeCog(commands.Cog, name='leetcode'):
             self.bot.logger.info(log_message)
             await ctx.send(user_message)
         
+        async def delivery_autocomplete(ctx: commands.Context, current: str):
+            return [
+                discord.app_commands.Choice(name='dm', value='dm'),
+                discord.app_commands.Choice(name='mention', value='mention')
+            ]
+
+        @set_config.command(
+            name='reminder',
+            brief='set personal reminder.',
+            description='remind yourself of the daily challenge until you submit.'
+        )
+        @discord.app_commands.describe(
+            hour='hour of a day (0-23)',
+            minute='minute of a hour (0-59)',
+            timezone='your timezone (default: the guild timezone)',
+            delivery='dm/mention (default: dm)'
+        )
+        @discord.app_commands.autocomplete(timezone=timezone_autocomplete, delivery=delivery_autocomplete)
+        async def set_reminder(ctx: commands.Context, hour: discord.app_commands.Range[int, 0, 23], minute: discord.app_commands.Range[int, 0, 59] = 0, timezone: str = None, delivery: str = 'dm') -> None:
+            user_message, log_message = self.leetcode_module.set_personal_reminder(ctx.guild, ctx.author, hour, minute, timezone, delivery)
+            self.bot.logger.info(log_message)
+            await ctx.send(user_message, ephemeral=True)
+
+        @set_config.command(
+            name='clear_reminder',
+            brief='remove personal reminder.',
+            description='remove your personal reminder.'
+        )
+        async def clear_reminder(ctx: commands.Context) -> None:
+            user_message, log_message = self.leetcode_module.clear_personal_reminder(ctx.guild, ctx.author)
+            self.bot.logger.info(log_message)
+            await ctx.send(user_message, ephemeral=True)
+
         @set_config.command(
             name='cookie',
             brief='set leetcode cookie.',
@@ -434,7 +488,7 @@ class LeetcodeCog(commands.Cog, name='leetcode'):
             val='leetcode cookie.'
         )
         async def set_cookie(ctx: commands.Context, val: str) -> None:
-            user_message, log_message = self.leetcode_module.set_cookie(val)
+            user_message, log_message = await self.leetcode_module.set_cookie(val)
             self.bot.logger.info(log_message)
             await ctx.send(user_message, ephemeral=True)
 
@@ -12,99 +12,325 @@
 @Desc      :    None
 '''
 
-from datetime import datetime
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
 import json
+import time
 import os
 import re
-import requests
 import shutil
-from typing import Tuple
+from typing import List, Optional, Tuple
 
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from apscheduler.triggers.cron import CronTrigger
+from apscheduler.triggers.interval import IntervalTrigger
 import discord
 from discord.ext import commands
-from pytz import timezone
-
-from cogs.leetcode.lib.LeetcodeGuild import LeetcodeGuild
+from pytz import timezone, UnknownTimeZoneError
+
+from cogs.leetcode.lib.LeetcodeCache import GuildCache, QuestionCache, SubmissionCache
+from cogs.leetcode.lib.LeetcodeCatalog import LeetcodeCatalog
+from cogs.leetcode.lib.LeetcodeClient import LeetcodeClient, LeetcodeRequestError
+from cogs.leetcode.lib.LeetcodeCookie import CookieStatus, SessionCookieValidator
+from cogs.leetcode.lib.LeetcodeDaily import DailyChallengeStore
+from cogs.leetcode.lib.LeetcodeDatabase import LeetcodeDatabase, SQLiteGuildConfigDict, StorageBackend
+from cogs.leetcode.lib.LeetcodeQueries import QUERIES
+from cogs.leetcode.lib.LeetcodeRateLimiter import RequestPriority
+from cogs.leetcode.lib.LeetcodeReminder import PersonalReminderDict, ReminderDelivery, ReminderTimer, next_occurrence
+from cogs.leetcode.lib.LeetcodeSchedule import PhaseFanout, PhaseMetrics, ScheduleBuckets, ScheduleStateDict
+from cogs.leetcode.lib.LeetcodeTime import format_time, pack_time, parse_time
+from cogs.leetcode.lib.LeetcodeGuild import GuildConfigDict, GuildManifestDict, LeetcodeGuild, migrate_json_guilds
 from lib.Exceptions import ModuleCommandException
+from lib.IODict import SerializationType, WriteBehindPolicy
 from utils.discord_utils import set_role
+from utils.io_utils import dump_data, dump_data_async, forget, get_io_stats
 
 class Leetcode:
-    __slots__ = ('url', 'EMBED_FIELD_VALUE_LIMIT', 'guilds', 'scheduler', 'data_dir_path', 'module_data_dir_name', 'daily_coding_challenge_cache', 'leetcode_session')
+    __slots__ = ('bot', 'url', 'EMBED_FIELD_VALUE_LIMIT', 'guilds', 'scheduler', 'data_dir_path', 'module_data_dir_name', 'module_data_dir_path', 'daily_challenges', 'client', 'catalog', 'catalog_refresh_interval', 'question_cache', 'background_tasks', 'pending_question_refreshes', 'submission_cache', 'cookie_validator', 'cookie_validation_interval', 'cookie_warning_period', 'cookie_warned_expiration', 'write_behind', 'journal_max_size', 'storage_backend', 'database', 'serialization_type', 'config_file_name', 'database_file_name', 'manifest', 'schedules', 'fanout', 'fanout_target_window', 'scheduler_metrics', 'scheduler_metrics_file_path', 'personal_reminders', 'reminder_timer')
+
+    MESSAGE_LENGTH_LIMIT = 2000
+
     def __init__(
         self,
         bot: commands.Bot,
         data_dir_path: str,
         module_data_dir_name: str = 'leetcode',
         config_file_name: str = 'config.json',
-        url: str = 'https://leetcode.com'
+        url: str = 'https://leetcode.com',
+        request_timeout: float = 10.0,
+        max_connections: int = 10,
+        max_concurrent_requests: int = 5,
+        catalog_file_name: str = 'catalog.json',
+        catalog_refresh_interval: float = 6 * 60 * 60,
+        question_cache_file_name: str = 'question cache.json',
+        question_cache_size: int = 512,
+        submission_cache_dir_name: Optional[str] = 'submissions',
+        submission_cache_size: int = 256,
+        daily_challenge_file_name: str = 'daily challenges.json',
+        cookie_validation_interval: float = 6 * 60 * 60,
+        cookie_warning_period: timedelta = timedelta(days=3),
+        guild_flush_interval: Optional[float] = 5.0,
+        guild_flush_max_delay: float = 30.0,
+        guild_journal_max_size: Optional[int] = None,
+        guild_serialization_type: SerializationType = SerializationType.JSON,
+        storage_backend: StorageBackend = StorageBackend.JSON,
+        database_file_name: str = 'guilds.db',
+        max_resident_guilds: Optional[int] = 1024,
+        preload_guilds: bool = False,
+        guild_load_workers: int = 8,
+        manifest_file_name: str = 'guild manifest.json',
+        fanout_concurrency: int = 16,
+        fanout_target_window: Optional[float] = 60.0,
+        schedule_state_file_name: str = 'schedule state.json',
+        scheduler_metrics_file_name: str = 'scheduler metrics.json',
+        personal_reminder_file_name: str = 'personal reminders.json'
     ):
+        self.bot = bot
         self.data_dir_path = data_dir_path
         self.module_data_dir_name = module_data_dir_name
+        self.module_data_dir_path = os.path.join(data_dir_path, module_data_dir_name)
+        os.makedirs(self.module_data_dir_path, exist_ok=True)
 
         self.scheduler = AsyncIOScheduler()
-        self.scheduler.start()
+        # guilds sharing a timezone and time share the job of that phase, the last run of every job
+        # is persisted so that the phases missed while the bot is down can be caught up
+        schedule_state_file_path = os.path.join(self.module_data_dir_path, schedule_state_file_name)
+        if os.path.exists(schedule_state_file_path):
+            schedule_state = ScheduleStateDict.from_file(schedule_state_file_path)
+        else:
+            schedule_state = ScheduleStateDict(schedule_state_file_path, sync=False)
+        self.schedules = ScheduleBuckets(self.scheduler, self.run_phase, schedule_state, misfire_grace_time=None)
+        # a phase fired for many guilds runs at most fanout_concurrency of them at once
+        self.scheduler_metrics = PhaseMetrics()
+        self.scheduler_metrics_file_path = os.path.join(self.module_data_dir_path, scheduler_metrics_file_name)
+        self.fanout = PhaseFanout(fanout_concurrency, metrics=self.scheduler_metrics)
+        # a warning is logged if the last message of a phase is sent later than this
+        self.fanout_target_window = fanout_target_window
         
         self.url = url
         self.EMBED_FIELD_VALUE_LIMIT = 1024
 
-        self.daily_coding_challenge_cache = None
-        self.get_daily_coding_challenge(use_cache=False)
+        self.daily_challenges = DailyChallengeStore(
+            self.fetch_daily_coding_challenge,
+            os.path.join(self.module_data_dir_path, daily_challenge_file_name)
+        )
+        self.daily_challenges.load()
 
-        self.leetcode_session = requests.Session()
-        self.leetcode_session.cookies.set('LEETCODE_SESSION', os.getenv('LEETCODE_SESSION'), path='/', domain='.leetcode.com')
+        self.client = LeetcodeClient(
+            url=url,
+            timeout=request_timeout,
+            max_connections=max_connections,
+            max_concurrent_requests=max_concurrent_requests
+        )
+        self.client.set_cookie('LEETCODE_SESSION', os.getenv('LEETCODE_SESSION'))
 
-        try:
-            self.get_cookie_status()
-        except e:
-            pass
+        self.cookie_validator = SessionCookieValidator(self.client)
+        self.cookie_validation_interval = cookie_validation_interval
+        self.cookie_warning_period = cookie_warning_period
+        self.cookie_warned_expiration = None
 
-        self.guilds = {}
-        for guild in os.listdir(data_dir_path):
-            guild_module_data_dir_path = os.path.join(data_dir_path, guild, module_data_dir_name)
-            if os.path.exists(guild_module_data_dir_path):
-                try:
-                    guild = bot.get_guild(int(guild))
-                    self.resume(guild, config_file_name)
-                except Exception as e:
-                    bot.logger.error(f'Leetcode: Failed to resume guild {guild.id}: {e}')
+        self.catalog = LeetcodeCatalog(self.client, os.path.join(self.module_data_dir_path, catalog_file_name))
+        self.catalog.load()
+        self.catalog_refresh_interval = catalog_refresh_interval
+
+        self.question_cache = QuestionCache(os.path.join(self.module_data_dir_path, question_cache_file_name), maxsize=question_cache_size)
+        self.question_cache.load()
+        self.background_tasks = set()
+        self.pending_question_refreshes = set()
+
+        self.submission_cache = SubmissionCache(
+            os.path.join(self.module_data_dir_path, submission_cache_dir_name) if submission_cache_dir_name else None,
+            maxsize=submission_cache_size
+        )
+
+        # guild files write through if guild_flush_interval is None
+        self.write_behind = WriteBehindPolicy(guild_flush_interval, guild_flush_max_delay) if guild_flush_interval is not None else None
+        # daily report and history score append to a journal instead if guild_journal_max_size is set
+        self.journal_max_size = guild_journal_max_size
+        # json backend guild files are converted to this serialization type when resumed
+        self.serialization_type = SerializationType(guild_serialization_type)
+        self.storage_backend = StorageBackend(storage_backend)
+        self.database = None
+        self.database_file_name = database_file_name
+        self.config_file_name = config_file_name
+        # guilds load on first access, at most max_resident_guilds of them stay in memory
+        self.guilds = GuildCache(self.load_guild, max_resident_guilds)
+        if self.storage_backend is StorageBackend.SQLITE:
+            database_file_path = os.path.join(self.module_data_dir_path, database_file_name)
+            migrate = not os.path.exists(database_file_path)
+            self.database = LeetcodeDatabase(database_file_path)
+            if migrate:
+                # one-shot import of the json backend when the database is created
+                imported = migrate_json_guilds(self.database, data_dir_path, module_data_dir_name, config_file_name)
+                bot.logger.info(f'Leetcode: Migrated {len(imported)} guilds to {database_file_path}.')
+        self.resume_guilds(os.path.join(self.module_data_dir_path, manifest_file_name), preload_guilds, guild_load_workers)
+        self.schedules.prune_state()
+
+        # personal reminders share one timer instead of one job per user
+        personal_reminder_file_path = os.path.join(self.module_data_dir_path, personal_reminder_file_name)
+        if os.path.exists(personal_reminder_file_path):
+            self.personal_reminders = PersonalReminderDict.from_file(personal_reminder_file_path, self.write_behind)
+        else:
+            self.personal_reminders = PersonalReminderDict(personal_reminder_file_path, sync=False, write_behind=self.write_behind)
+        self.reminder_timer = ReminderTimer(self.deliver_personal_reminders)
+        self.schedule_personal_reminders(self.personal_reminders)
+
+        # jobs added before the start are registered with the job store in one batch
+        self.scheduler.start()
+
+    async def setup(self):
+        if len(self.catalog) == 0:
+            await self.refresh_catalog()
+        self.scheduler.add_job(
+            self.refresh_catalog,
+            IntervalTrigger(seconds=self.catalog_refresh_interval),
+            id='leetcode catalog refresh',
+            replace_existing=True
+        )
+        self.scheduler.add_job(
+            self.dump_question_cache,
+            IntervalTrigger(minutes=10),
+            id='leetcode question cache dump',
+            replace_existing=True
+        )
+        self.scheduler.add_job(
+            self.dump_scheduler_metrics,
+            IntervalTrigger(minutes=10),
+            id='leetcode scheduler metrics dump',
+            replace_existing=True
+        )
+
+        self.scheduler.add_job(
+            self.prefetch_daily_coding_challenge,
+            CronTrigger(hour=0, minute=0, second=30, timezone='UTC'),
+            id='leetcode daily challenge prefetch',
+            replace_existing=True
+        )
+
+        # never block the startup on leetcode, the stored challenges are served until the fetch completes
+        if self.daily_challenges.get_cached() is None:
+            self.daily_challenges.revalidate()
+
+        self.run_in_background(self.catch_up_phases())
+        self.reminder_timer.start()
+
+        self.scheduler.add_job(
+            self.validate_cookie,
+            IntervalTrigger(seconds=self.cookie_validation_interval),
+            id='leetcode cookie validation',
+            next_run_time=datetime.now(),
+            replace_existing=True
+        )
+
+    async def prefetch_daily_coding_challenge(self, attempts: int = 5, retry_delay: float = 30.0):
+        # leetcode may publish the new daily challenge a little after the utc rollover
+        for attempt in range(attempts):
+            try:
+                challenge = await self.daily_challenges.get()
+            except ModuleCommandException as e:
+                self.bot.logger.warning(f'Leetcode: Failed to prefetch daily coding challenge (attempt {attempt + 1}/{attempts}): {e}')
+            else:
+                if challenge['date'] == self.daily_challenges.today():
+                    self.bot.logger.info(f"Leetcode: Daily coding challenge for {challenge['date']} prefetched.")
+                    return
+            await asyncio.sleep(retry_delay)
+        self.bot.logger.error(f'Leetcode: Failed to prefetch daily coding challenge for {self.daily_challenges.today()}.')
+
+    async def refresh_catalog(self):
+        try:
+            changed = await self.catalog.refresh()
+        except LeetcodeRequestError as e:
+            self.bot.logger.error(f'Leetcode: Failed to refresh problem catalog: {e}')
+            return
+        self.bot.logger.info(f'Leetcode: Problem catalog refreshed ({changed} of {len(self.catalog)} problems updated).')
+
+    async def dump_question_cache(self):
+        # serializes on the event loop so that the snapshot never races with cache updates
+        await self.question_cache.dump_async()
+
+    async def dump_scheduler_metrics(self):
+        await dump_data_async(self.scheduler_metrics.snapshot(), self.scheduler_metrics_file_path)
+
+    def run_in_background(self, coro) -> asyncio.Task:
+        task = asyncio.create_task(coro)
+        self.background_tasks.add(task)
+        task.add_done_callback(self.background_tasks.discard)
+        return task
+
+    async def close(self):
+        self.scheduler.shutdown(wait=False)
+        self.reminder_timer.stop()
+        for task in self.background_tasks:
+            task.cancel()
+        self.flush_guilds()
+        self.manifest.flush()
+        self.personal_reminders.flush()
+        self.question_cache.dump()
+        dump_data(data=self.scheduler_metrics.snapshot(), file_path=self.scheduler_metrics_file_path)
+        if self.database is not None:
+            self.database.close()
+        await self.client.close()
+
+    def flush_guilds(self):
+        for guild_id, leetcode_guild in self.guilds.resident_items():
+            try:
+                leetcode_guild.flush()
+            except Exception as e:
+                self.bot.logger.error(f'Leetcode: Failed to flush guild {guild_id} data: {e}')
     
-    def set_cookie(self, val: str):
-        self.leetcode_session.cookies.set('LEETCODE_SESSION', val, path='/', domain='.leetcode.com')
-        user_message, log_message = self.get_cookie_status()
+    async def set_cookie(self, val: str):
+        self.client.set_cookie('LEETCODE_SESSION', val)
+        self.cookie_validator.reset()
+        self.cookie_warned_expiration = None
+        self.run_in_background(self.validate_cookie())
+        user_message = "Cookie has been set, its status will be updated after validation."
+        log_message = "Cookie has been set."
         return user_message, log_message
     
     def get_cookie_status(self):
-        response = self.leetcode_session.post(
-            "https://leetcode.com/graphql",
-            json={
-                "query": "query currentTimestamp {currentTimestamp}",
-                "variables": {},
-                "operationName": "currentTimestamp"
-            }
-        )
-        session_cookie = list(filter(lambda x: x.name == 'LEETCODE_SESSION', self.leetcode_session.cookies))
-        if not session_cookie:
-            user_message = f"Cookie Status: Undefined."
-            log_message = f"Cookie Status: Undefined."
-            return user_message, log_message
-        
-        session_cookie = session_cookie[0]
-        
-        if session_cookie.expires is None:
-            user_message = f"Cookie Status: Invalid. (Expiration time: Unknown)"
-            log_message = f"Cookie Status: Invalid. (Expiration time: Unknown)"
-            return user_message, log_message
-        
-        expire_time = datetime.fromtimestamp(session_cookie.expires)
-        if expire_time <= datetime.now():
-            user_message = f"Cookie Status: Expired. (Expiration time: {expire_time})"
-            log_message = f"Cookie Status: Expired. (Expiration time: {expire_time})"
-        
-        user_message = f"Cookie Status: Valid. (Expiration time: {expire_time})"
-        log_message = f"Cookie Status: Valid. (Expiration time: {expire_time})"
-        return user_message, log_message
+        status = self.cookie_validator.status
+        if status is CookieStatus.UNDEFINED:
+            message = f"Cookie Status: {status.value}."
+        else:
+            message = f"Cookie Status: {status.value}. (Expiration time: {self.cookie_validator.expire_time})"
+        if self.cookie_validator.checked_at is not None:
+            message += f" (Last checked: {self.cookie_validator.checked_at.strftime('%Y-%m-%d %H:%M:%S')})"
+        return message, message
+
+    async def validate_cookie(self):
+        previous_status = self.cookie_validator.status
+        try:
+            status = await self.cookie_validator.validate()
+        except LeetcodeRequestError as e:
+            self.bot.logger.warning(f'Leetcode: Failed to validate cookie: {e}')
+            return
+        _, log_message = self.get_cookie_status()
+        self.bot.logger.info(f'Leetcode: {log_message}')
+
+        if status is not previous_status and previous_status is CookieStatus.VALID:
+            await self.notify_owners(f'⚠️ Leetcode session cookie is no longer valid. {log_message}')
+        elif status is CookieStatus.VALID and self.cookie_validator.expires is not None \
+                and self.cookie_validator.expires - datetime.now() <= self.cookie_warning_period \
+                and self.cookie_warned_expiration != self.cookie_validator.expires:
+            # warn once per cookie
+            self.cookie_warned_expiration = self.cookie_validator.expires
+            await self.notify_owners(f'⚠️ Leetcode session cookie expires at {self.cookie_validator.expire_time}, please set a new one.')
+
+    def request_cookie_validation(self, min_interval: float = 60.0):
+        # auth failures tend to come in bursts, validate at most once per min_interval seconds
+        checked_at = self.cookie_validator.checked_at
+        if checked_at is not None and (datetime.now() - checked_at).total_seconds() < min_interval:
+            return
+        self.run_in_background(self.validate_cookie())
+
+    async def notify_owners(self, message: str):
+        for owner_id in self.bot.config['owners']:
+            try:
+                owner = self.bot.get_user(owner_id) or await self.bot.fetch_user(owner_id)
+                await owner.send(message)
+            except discord.HTTPException as e:
+                self.bot.logger.error(f'Leetcode: Failed to notify owner {owner_id}: {e}')
 
     async def initialize(
             self,
@@ -116,29 +342,150 @@ class Leetcode:
         leetcode_role = await self.set_leetcode_role(guild)
         leetcode_role_id = leetcode_role.id
 
+        if self.database is not None:
+            self.guilds[guild_id] = LeetcodeGuild.create_in_database(self.database, guild_id, leetcode_role_id, leetcode_channel_id)
+            return self.add_leetcode_schedule(guild)
+
         guild_module_data_dir_path = os.path.join(self.data_dir_path, str(guild_id), self.module_data_dir_name)
+        if self.guilds.is_resident(guild_id):
+            # pending writes of the old guild data must not land in the new directory
+            self.guilds.evict(guild_id)
         if os.path.exists(guild_module_data_dir_path):
             shutil.rmtree(guild_module_data_dir_path)
+            forget(guild_module_data_dir_path)
         os.makedirs(guild_module_data_dir_path)
 
-        self.guilds[guild_id] = LeetcodeGuild(guild_module_data_dir_path, leetcode_role_id, leetcode_channel_id, config_file_name)
+        self.guilds[guild_id] = LeetcodeGuild(guild_module_data_dir_path, leetcode_role_id, leetcode_channel_id, config_file_name, write_behind=self.write_behind, journal_max_size=self.journal_max_size, serialization_type=self.serialization_type)
 
         message = self.add_leetcode_schedule(guild)
         return message
     
+    def discover_guilds(self) -> List[int]:
+        if self.database is not None:
+            return self.database.guild_ids()
+        return [
+            int(guild) for guild in os.listdir(self.data_dir_path)
+            if guild.isdigit() and os.path.exists(os.path.join(self.data_dir_path, guild, self.module_data_dir_name))
+        ]
+
+    def resume_guilds(self, manifest_file_path: str, preload: bool = False, load_workers: int = 8):
+        """Register every stored guild and schedule the enabled ones
+
+        The guilds and their schedules are read from the manifest. Without a manifest, or with one
+        written for another storage backend, the guilds are discovered from the backend and the
+        manifest is rebuilt from their configs.
+
+        Guild files are read and parsed on a thread pool. Without preload no guild file is read
+        when the manifest is valid, the guild data loads when a command or a job needs it.
+
+        Args:
+            manifest_file_path (str): manifest file path
+            preload (bool, optional): whether to load the guild data up to the resident guild limit. Defaults to False.
+            load_workers (int, optional): number of threads reading guild files. Defaults to 8.
+        """
+        start = time.perf_counter()
+        rebuild = True
+        if os.path.exists(manifest_file_path):
+            # written through, the manifest is the only record of the guilds at startup and its mutations are rare
+            self.manifest = GuildManifestDict.from_file(manifest_file_path)
+            rebuild = any(entry['storage_backend'] != self.storage_backend.value for entry in self.manifest.values())
+        if rebuild:
+            self.manifest = GuildManifestDict(manifest_file_path, sync=False)
+            guild_ids = self.discover_guilds()
+        else:
+            guild_ids = list(self.manifest)
+        discovered = time.perf_counter()
+
+        preload_count = 0
+        if preload:
+            preload_count = len(guild_ids) if self.guilds.max_resident is None else min(len(guild_ids), self.guilds.max_resident)
+
+        def load(index: int, guild_id: int):
+            try:
+                if index < preload_count:
+                    leetcode_guild = self.load_guild(guild_id)
+                    return guild_id, leetcode_guild, leetcode_guild.config, None
+                if rebuild:
+                    # only the config is needed to schedule a guild
+                    return guild_id, None, self.load_guild_config(guild_id), None
+                return guild_id, None, None, None
+            except Exception as e:
+                return guild_id, None, None, e
+
+        if self.database is not None or load_workers <= 1:
+            # a sqlite connection cannot be shared across threads, and its reads are cheap anyway
+            results = [load(index, guild_id) for index, guild_id in enumerate(guild_ids)]
+        else:
+            with ThreadPoolExecutor(max_workers=load_workers, thread_name_prefix='leetcode-resume') as executor:
+                results = list(executor.map(load, range(len(guild_ids)), guild_ids))
+        loaded = time.perf_counter()
+
+        scheduled = 0
+        with self.manifest.transaction(), self.schedules.state.transaction():
+            for guild_id, leetcode_guild, config, error in results:
+                if error is not None:
+                    self.bot.logger.error(f'Leetcode: Failed to resume guild {guild_id}: {error}')
+                    continue
+                if leetcode_guild is not None:
+                    self.guilds[guild_id] = leetcode_guild
+                else:
+                    self.guilds.add(guild_id)
+                if config is not None:
+                    self.record_guild(guild_id, config)
+                schedule = self.manifest[guild_id]['schedule']
+                if schedule is not None:
+                    self.schedule_guild(guild_id, schedule)
+                    scheduled += 1
+        if rebuild and not os.path.exists(manifest_file_path):
+            # the transaction wrote nothing without guilds, the next start still reads the manifest
+            self.manifest.sync()
+        end = time.perf_counter()
+
+        self.bot.logger.info(
+            f'Leetcode: Resumed {len(guild_ids)} guilds ({preload_count} preloaded, {scheduled} scheduled in {len(self.schedules)} jobs{", manifest rebuilt" if rebuild else ""}) in {end - start:.3f}s '
+            f'(discover: {discovered - start:.3f}s, load: {loaded - discovered:.3f}s, schedule: {end - loaded:.3f}s)'
+        )
+
+    def record_guild(self, guild_id: int, config: dict):
+        # keeps the manifest entry in step with the guild config
+        if self.database is not None:
+            self.manifest.record(guild_id, self.storage_backend.value, self.database_file_name, config)
+        else:
+            self.manifest.record(guild_id, self.storage_backend.value, os.path.join(str(guild_id), self.module_data_dir_name), config)
+
+    def get_guild_module_data_dir_path(self, guild_id: int) -> str:
+        entry = self.manifest.get(guild_id)
+        if entry is not None:
+            return os.path.join(self.data_dir_path, entry['location'])
+        return os.path.join(self.data_dir_path, str(guild_id), self.module_data_dir_name)
+
+    def load_guild(self, guild_id: int) -> LeetcodeGuild:
+        if self.database is not None:
+            return LeetcodeGuild.from_database(self.database, guild_id)
+        return LeetcodeGuild.from_file(self.get_guild_module_data_dir_path(guild_id), self.config_file_name, self.write_behind, self.journal_max_size, self.serialization_type)
+
+    def load_guild_config(self, guild_id: int) -> dict:
+        if self.guilds.is_resident(guild_id):
+            return self.guilds[guild_id].config
+        if self.database is not None:
+            return SQLiteGuildConfigDict.from_database(self.database, guild_id)
+        return GuildConfigDict.from_file(os.path.join(self.get_guild_module_data_dir_path(guild_id), self.config_file_name))
+
     def resume(self, guild: discord.Guild, config_file_name: str = 'config.json'):
-        guild_module_data_dir_path = os.path.join(self.data_dir_path, str(guild.id), self.module_data_dir_name)
-        if not os.path.exists(guild_module_data_dir_path):
+        if guild.id not in self.guilds:
             raise ModuleCommandException(
                 log_message=f'Guild {guild.id} has not been initialized.',
                 user_message='Guild has not been initialized.',
                 module_name=self.module_data_dir_name
             )
 
-        self.guilds[guild.id] = LeetcodeGuild.from_file(guild_module_data_dir_path, config_file_name)
+        if self.guilds.is_resident(guild.id):
+            self.guilds.evict(guild.id)
+        self.guilds[guild.id] = self.load_guild(guild.id)
         
-        self.remove_leetcode_schedule(guild)
-        self.add_leetcode_schedule(guild)
+        with self.guilds[guild.id].config.transaction():
+            self.remove_leetcode_schedule(guild)
+            self.add_leetcode_schedule(guild)
 
         return "Guild has been resumed."
     
@@ -160,67 +507,48 @@ class Leetcode:
         self.remove_leetcode_schedule(guild)
 
         # remove data
-        guild_module_data_dir_path = os.path.join(self.data_dir_path, str(guild.id), self.module_data_dir_name)
-        if os.path.exists(guild_module_data_dir_path):
-            shutil.rmtree(guild_module_data_dir_path)
+        self.guilds[guild.id].flush()
+        if self.database is not None:
+            self.database.delete_guild(guild.id)
+        else:
+            guild_module_data_dir_path = self.get_guild_module_data_dir_path(guild.id)
+            if os.path.exists(guild_module_data_dir_path):
+                shutil.rmtree(guild_module_data_dir_path)
+                forget(guild_module_data_dir_path)
         del self.guilds[guild.id]
+        del self.manifest[guild.id]
+        with self.personal_reminders.transaction():
+            for key in [key for key in self.personal_reminders if PersonalReminderDict.split_key(key)[0] == guild.id]:
+                self.reminder_timer.cancel(key)
+                del self.personal_reminders[key]
 
         return "Leetcode module data has been cleaned."
     
     def add_leetcode_schedule(self, guild: discord.Guild):
-        self.add_time_schedule(guild, 'start')
-        self.add_time_schedule(guild, 'remind')
-        self.add_time_schedule(guild, 'end')
+        self.schedule_guild(guild.id, self.guilds[guild.id].config)
 
         self.guilds[guild.id].config['daily_challenge_status'] = True
+        self.record_guild(guild.id, self.guilds[guild.id].config)
 
         message = f"Leetcode daily coding challenge job all set.\n" + \
             f"Daily timezone: {self.guilds[guild.id].config['timezone']}\n" + \
-            f"Daily start time: {':'.join(self.guilds[guild.id].config['start_time'].values())}\n" + \
-            f"Daily remind time: {':'.join(self.guilds[guild.id].config['remind_time'].values())}\n" + \
-            f"Daily end time: {':'.join(self.guilds[guild.id].config['end_time'].values())}"
+            f"Daily start time: {format_time(self.guilds[guild.id].config['start_time'])}\n" + \
+            f"Daily remind time: {format_time(self.guilds[guild.id].config['remind_time'])}\n" + \
+            f"Daily end time: {format_time(self.guilds[guild.id].config['end_time'])}"
         return message
 
-    def add_time_schedule(self, guild: discord.Guild, time_type: str) -> Tuple[str, str]:
-        leetcode_channel = guild.get_channel(self.guilds[guild.id].config['leetcode_channel_id'])
-        leetcode_role = guild.get_role(self.guilds[guild.id].config['leetcode_role_id'])
+    def schedule_guild(self, guild_id: int, config: dict):
+        self.add_time_schedule(guild_id, 'start', config)
+        self.add_time_schedule(guild_id, 'remind', config)
+        self.add_time_schedule(guild_id, 'end', config)
 
-        if self.scheduler.get_job(f"leetcode {time_type} {guild.id}"):
-            self.scheduler.remove_job(f"leetcode {time_type} {guild.id}")
-        
-        if time_type == 'start':
-            self.scheduler.add_job(
-                self.leetcode_start,
-                CronTrigger(
-                    **self.guilds[guild.id].config['start_time'],
-                    timezone=self.guilds[guild.id].config['timezone']
-                ),
-                args=(leetcode_channel, leetcode_role),
-                misfire_grace_time=None,
-                id=f'leetcode start {guild.id}'
-            )
-        elif time_type == 'remind':
-            self.scheduler.add_job(
-                self.leetcode_remind,
-                CronTrigger(
-                    **self.guilds[guild.id].config['remind_time'],
-                    timezone=self.guilds[guild.id].config['timezone']
-                ),
-                args=(guild, self.guilds[guild.id].daily_report, leetcode_channel),
-                misfire_grace_time=None,
-                id=f'leetcode remind {guild.id}'
-            )
-        elif time_type == 'end':
-            self.scheduler.add_job(
-                self.leetcode_end,
-                CronTrigger(
-                    **self.guilds[guild.id].config['end_time'],
-                    timezone=self.guilds[guild.id].config['timezone']
-                ),
-                args=(guild, leetcode_channel),
-                misfire_grace_time=None,
-                id=f'leetcode end {guild.id}'
-            )
+    def add_time_schedule(self, guild_id: int, time_type: str, config: Optional[dict] = None) -> Tuple[str, str]:
+        # buckets only keep the guild id, the guild is loaded when its phase fires
+        if config is None:
+            config = self.guilds[guild_id].config
+
+        if time_type in ('start', 'remind', 'end'):
+            self.schedules.add(guild_id, time_type, config['timezone'], parse_time(config[f'{time_type}_time']))
         else:
             raise ModuleCommandException(
                 log_message=f'Time type {time_type} is not supported.',
@@ -229,18 +557,74 @@ class Leetcode:
             )
         
         user_message = f"The leetcode daily coding challenge's {time_type} time has been set successfully."
-        log_message = f"The leetcode daily coding challenge's {time_type} time for guild {guild.id} has been set successfully."
+        log_message = f"The leetcode daily coding challenge's {time_type} time for guild {guild_id} has been set successfully."
         return user_message, log_message
 
-    async def leetcode_start(self, leetcode_channel: discord.TextChannel, leetcode_role: discord.Role):
-        embed = self.get_daily_coding_challenge(use_cache=False)
-        await leetcode_channel.send(embed=embed)
-        await leetcode_channel.send(f"The new daily coding challenge has released! {leetcode_role.mention}")
+    async def catch_up_phases(self):
+        # jobs fired since the scheduler started have recorded or are running their run and are not missed
+        missed = self.schedules.missed()
+        if not missed:
+            return
+        self.bot.logger.info(f'Leetcode: Catching up {len(missed)} phases missed while offline.')
+        for fire_time, phase, tz_name, seconds in missed:
+            if self.schedules.last_run(phase, tz_name, seconds) >= fire_time.timestamp():
+                # the job fired on its own in the meantime
+                continue
+            self.bot.logger.info(f'Leetcode: Running the {phase} phase missed at {fire_time.isoformat()}.')
+            await self.run_phase(phase, tz_name, seconds, fire_time)
+
+    async def run_phase(self, phase: str, tz_name: str, seconds: int, planned: Optional[datetime] = None):
+        if not self.schedules.start_run(phase, tz_name, seconds):
+            self.bot.logger.warning(f'Leetcode: {phase.capitalize()} phase at {format_time(seconds)} {tz_name} is still running, skipped.')
+            return
+        # the job is only given its bucket, the fire time it was planned for is derived from the trigger
+        planned = planned or self.schedules.planned_time(tz_name, seconds)
+        planned_timestamp = planned.timestamp() if planned is not None else None
+        handler = {'start': self.leetcode_start, 'remind': self.leetcode_remind, 'end': self.leetcode_end}[phase]
+
+        async def run_guild(guild_id: int):
+            await handler(guild_id)
+            self.schedules.mark_done(phase, tz_name, seconds, guild_id, planned_timestamp)
+
+        # guilds done before a crash are not run again, the guilds are only loaded by their handler
+        done = self.schedules.done_guilds(phase, tz_name, seconds, planned_timestamp)
+        items = [(guild_id, lambda guild_id=guild_id: run_guild(guild_id)) for guild_id in self.schedules.members(phase, tz_name, seconds) if guild_id not in done]
+
+        try:
+            report = await self.fanout.run(phase, items, planned_timestamp)
+        except BaseException:
+            self.schedules.finish_run(phase, tz_name, seconds, completed=False)
+            raise
+        self.schedules.finish_run(phase, tz_name, seconds)
+        for guild_id, error in report.failed.items():
+            self.bot.logger.error(f'Leetcode: Failed to run the {phase} phase in guild {guild_id}: {error}')
+        time_to_last_message = report.time_to_last_message
+        summary = (
+            f'Leetcode: {phase.capitalize()} phase at {format_time(seconds)} {tz_name} finished for {report.total} guilds '
+            f'({report.done} done, {len(report.failed)} failed, {report.retries} retries) in {report.duration:.3f}s'
+        )
+        if time_to_last_message is not None:
+            summary += f', last message after {time_to_last_message:.3f}s'
+        if self.fanout_target_window is not None and time_to_last_message is not None and time_to_last_message > self.fanout_target_window:
+            self.bot.logger.warning(f'{summary}, over the target window of {self.fanout_target_window:.0f}s')
+        else:
+            self.bot.logger.info(summary)
+
+    async def leetcode_start(self, guild_id: int):
+        guild = self.bot.get_guild(guild_id)
+        leetcode_channel = guild.get_channel(self.guilds[guild_id].config['leetcode_channel_id'])
+        leetcode_role = guild.get_role(self.guilds[guild_id].config['leetcode_role_id'])
+        challenge = await self.daily_challenges.get()
+        embed = self.generate_daily_coding_challenge_embed(challenge)
+        await self.fanout.send(leetcode_channel, embed=embed)
+        await self.fanout.send(leetcode_channel, f"The new daily coding challenge has released! {leetcode_role.mention}")
     
-    async def leetcode_remind(self, guild: discord.Guild, daily_report: dict, leetcode_channel: discord.TextChannel):
+    async def leetcode_remind(self, guild_id: int):
+        guild = self.bot.get_guild(guild_id)
+        leetcode_channel = guild.get_channel(self.guilds[guild_id].config['leetcode_channel_id'])
         unfinishedCount = 0
         unfinishedUser = ""
-        for user_id, value in daily_report.items():
+        for user_id, value in self.guilds[guild_id].daily_report.items():
             user = guild.get_member(user_id)
             if value == 0:
                 unfinishedCount += 1
@@ -248,28 +632,32 @@ class Leetcode:
         content = "Today's leetcode daily coding challenge will be end soon. You still have some time to complete it."
         if unfinishedCount > 0:
             content += "\n" + unfinishedUser
-        await leetcode_channel.send(content)
+        await self.fanout.send(leetcode_channel, content)
     
-    async def leetcode_end(self, guild: discord.Guild, leetcode_channel: discord.TextChannel):
+    async def leetcode_end(self, guild_id: int):
+        guild = self.bot.get_guild(guild_id)
+        leetcode_channel = guild.get_channel(self.guilds[guild_id].config['leetcode_channel_id'])
         completedUser = ""
         completedCount = 0
         unfinishedUser = ""
         unfinishedCount = 0
-        for user_id, value in self.guilds[guild.id].daily_report.items():
-            user = guild.get_member(user_id)
-            if value == 1:
-                completedCount += 1
-                completedUser += f"\n{completedCount}. {user.name}"
-                self.guilds[guild.id].daily_report[user_id] = 0
-            else:
-                unfinishedCount += 1
-                unfinishedUser += f"\n{unfinishedCount}. {user.name}"
+        daily_report = self.guilds[guild_id].daily_report
+        with daily_report.transaction():
+            for user_id, value in daily_report.items():
+                user = guild.get_member(user_id)
+                if value == 1:
+                    completedCount += 1
+                    completedUser += f"\n{completedCount}. {user.name}"
+                    daily_report[user_id] = 0
+                else:
+                    unfinishedCount += 1
+                    unfinishedUser += f"\n{unfinishedCount}. {user.name}"
         content = "Today's leetcode daily coding challenge has ended."
         if completedCount > 0:
             content += f"\nCompleted participants (total: {completedCount}):" + completedUser
         if unfinishedCount > 0:
             content += f"\nUnfinished participants (total: {unfinishedCount}):" + unfinishedUser
-        await leetcode_channel.send(content)
+        await self.fanout.send(leetcode_channel, content)
 
     def remove_leetcode_schedule(self, guild: discord.Guild):
         self.remove_time_schedule(guild, 'start')
@@ -277,14 +665,14 @@ class Leetcode:
         self.remove_time_schedule(guild, 'end')
 
         self.guilds[guild.id].config['daily_challenge_status'] = False
+        self.record_guild(guild.id, self.guilds[guild.id].config)
         
         user_message = "The leetcode daily coding challenge has stopped successfully."
         log_message = f"The leetcode daily coding challenge for guild {guild.id} has stopped successfully."
         return user_message, log_message
     
     def remove_time_schedule(self, guild: discord.Guild, time_type: str) -> Tuple[str, str]:
-        if self.scheduler.get_job(f"leetcode {time_type} {guild.id}"):
-            self.scheduler.remove_job(f"leetcode {time_type} {guild.id}")
+        self.schedules.remove(guild.id, time_type)
         
         user_message = f"The leetcode daily coding challenge's {time_type} time scheduler has been removed successfully."
         log_message = f"The leetcode daily coding challenge's {time_type} time scheduler for guild {guild.id} has been removed successfully."
@@ -300,8 +688,9 @@ class Leetcode:
         else:
             await user.add_roles(leetcode_role)
 
-            self.guilds[guild.id].daily_report[user.id] = 0
-            self.guilds[guild.id].history_score[user.id] = 0
+            with self.guilds[guild.id].transaction():
+                self.guilds[guild.id].daily_report[user.id] = 0
+                self.guilds[guild.id].history_score[user.id] = 0
 
             user_message = f'{user.mention} you successfully join the leetcode daily coding challenge!'
             log_message = f'User {user} ({user.id}) successfully joined the daily leetcode challenge in guild {guild.id}.'
@@ -313,8 +702,10 @@ class Leetcode:
         leetcode_role = guild.get_role(int(self.guilds[guild.id].config['leetcode_role_id']))
         if user.id in self.guilds[guild.id].daily_report:
             await user.remove_roles(leetcode_role)
-            del self.guilds[guild.id].daily_report[user.id]
-            del self.guilds[guild.id].history_score[user.id]
+            with self.guilds[guild.id].transaction():
+                del self.guilds[guild.id].daily_report[user.id]
+                del self.guilds[guild.id].history_score[user.id]
+            self.remove_personal_reminder(guild.id, user.id)
             user_message = f'{user.mention} you successfully quit the leetcode daily coding challenge!'
             log_message = f'User {user} ({user.id}) successfully quit the daily leetcode challenge in guild {guild.id}.'
         else:
@@ -322,10 +713,9 @@ class Leetcode:
             log_message = f'User {user} ({user.id}) tried to quit the daily leetcode challenge in guild {guild.id} but not joined.'
         return user_message, log_message
 
-    def submit_solution(self, guild: discord.Guild, user: discord.Member, url: str) -> Tuple[str, discord.Embed, str]:
+    async def submit_solution(self, guild: discord.Guild, user: discord.Member, url: str) -> Tuple[str, discord.Embed, str]:
         # check if guild has been initialized
-        guild_module_data_dir_path = os.path.join(self.data_dir_path, str(guild.id), self.module_data_dir_name)
-        if not os.path.exists(guild_module_data_dir_path):
+        if guild.id not in self.guilds:
             raise ModuleCommandException(
                 log_message=f'Guild {guild.id} has not been initialized.',
                 user_message='Guild has not been initialized.',
@@ -350,22 +740,30 @@ class Leetcode:
             )
         
         # check problem name
-        if problem_name != self.daily_coding_challenge_cache['question']['titleSlug']:
+        try:
+            daily_challenge = await self.daily_challenges.get()
+        except ModuleCommandException:
+            # keep validating against the stored challenge while leetcode is unreachable
+            daily_challenge = self.daily_challenges.latest()
+            if daily_challenge is None:
+                raise
+        if problem_name != daily_challenge['question']['titleSlug']:
             raise ModuleCommandException(
-                log_message=f"Invalid problem name '{problem_name}' from user {user.id} in guild {guild.id} while the correct problem name is '{self.daily_coding_challenge_cache['question']['titleSlug']}'.",
-                user_message=f"Incorrect daily problem. Please check the problem and try again. Today's leetcode problem is '{self.daily_coding_challenge_cache['question']['title']}'.",
+                log_message=f"Invalid problem name '{problem_name}' from user {user.id} in guild {guild.id} while the correct problem name is '{daily_challenge['question']['titleSlug']}'.",
+                user_message=f"Incorrect daily problem. Please check the problem and try again. Today's leetcode problem is '{daily_challenge['question']['title']}'.",
                 module_name=self.module_data_dir_name
             )
         
-        user_embed = self.get_submission(guild, submission_id)
+        user_embed = await self.get_submission(guild, submission_id)
 
         if self.guilds[guild.id].daily_report[user.id] == 1:
             user_message = f'You have already submitted your solution today.'
             log_message = f'User {user} ({user.id}) tried to submit their solution in guild {guild.id} but already submitted.'
             return user_message, None, log_message
         
-        self.guilds[guild.id].daily_report[user.id] += 1
-        self.guilds[guild.id].history_score[user.id] += 1
+        with self.guilds[guild.id].transaction():
+            self.guilds[guild.id].daily_report[user.id] += 1
+            self.guilds[guild.id].history_score[user.id] += 1
         user_message = f'Solution received!'
         log_message = f'User {user} ({user.id}) successfully submitted their solution in guild {guild.id}.'
         
@@ -389,26 +787,162 @@ class Leetcode:
         message = f'Set leetcode channel to {leetcode_channel.mention}'
         return message
     
-    def set_timezone(self, guild: discord.Guild, timezone: str) -> str:
-        self.guilds[guild.id].config["timezone"] = timezone
-        self.remove_leetcode_schedule(guild)
-        self.add_leetcode_schedule(guild)
-        user_message = f"Set timezone to '{timezone}' successfully."
-        log_message = f"Set timezone to '{timezone}' in guild {guild.id} successfully."
+    def set_timezone(self, guild: discord.Guild, timezone_name: str) -> str:
+        # validated before the schedule is touched, a rolled back config does not restore the removed jobs
+        try:
+            timezone(timezone_name)
+        except UnknownTimeZoneError:
+            raise ModuleCommandException(
+                log_message=f'Timezone {timezone_name} is not supported.',
+                user_message=f'Timezone {timezone_name} is not supported.',
+                module_name=self.module_data_dir_name
+            )
+        with self.guilds[guild.id].config.transaction():
+            self.guilds[guild.id].config["timezone"] = timezone_name
+            self.remove_leetcode_schedule(guild)
+            self.add_leetcode_schedule(guild)
+        user_message = f"Set timezone to '{timezone_name}' successfully."
+        log_message = f"Set timezone to '{timezone_name}' in guild {guild.id} successfully."
         return user_message, log_message
     
     def set_time(self, guild: discord.Guild, time_type: str, hour: int, minute: int, second: int) -> str:
-        self.guilds[guild.id].config[f"{time_type}_time"] = {
-            "hour": f"{hour:02d}",
-            "minute": f"{minute:02d}",
-            "second": f"{second:02d}"
-        }
-        self.remove_leetcode_schedule(guild)
-        self.add_leetcode_schedule(guild)
+        with self.guilds[guild.id].config.transaction():
+            self.guilds[guild.id].config[f"{time_type}_time"] = pack_time(hour, minute, second)
+            self.remove_leetcode_schedule(guild)
+            self.add_leetcode_schedule(guild)
         user_message = f"Set {time_type} time to {hour:02d}:{minute:02d}:{second:02d} successfully."
         log_message = f"Set {time_type} time to {hour:02d}:{minute:02d}:{second:02d} in guild {guild.id} successfully."
         return user_message, log_message
 
+    def set_personal_reminder(self, guild: discord.Guild, user: discord.Member, hour: int, minute: int, timezone_name: Optional[str] = None, delivery: str = 'dm') -> Tuple[str, str]:
+        if guild.id not in self.guilds:
+            raise ModuleCommandException(
+                log_message=f'Guild {guild.id} has not been initialized.',
+                user_message='Guild has not been initialized.',
+                module_name=self.module_data_dir_name
+            )
+        if user.id not in self.guilds[guild.id].daily_report:
+            user_message = 'You have not joined the daily leetcode challenge yet.'
+            log_message = f'User {user} ({user.id}) tried to set a personal reminder in guild {guild.id} but not joined.'
+            return user_message, log_message
+        try:
+            delivery = ReminderDelivery(delivery)
+        except ValueError:
+            raise ModuleCommandException(
+                log_message=f'Reminder delivery {delivery} is not supported.',
+                user_message=f'Reminder delivery {delivery} is not supported.',
+                module_name=self.module_data_dir_name
+            )
+        if timezone_name is None:
+            timezone_name = self.guilds[guild.id].config['timezone']
+        try:
+            timezone(timezone_name)
+        except UnknownTimeZoneError:
+            raise ModuleCommandException(
+                log_message=f'Timezone {timezone_name} is not supported.',
+                user_message=f'Timezone {timezone_name} is not supported.',
+                module_name=self.module_data_dir_name
+            )
+
+        key = PersonalReminderDict.make_key(guild.id, user.id)
+        reminder = {'timezone': timezone_name, 'time': pack_time(hour, minute, 0), 'delivery': delivery.value}
+        self.personal_reminders[key] = reminder
+        self.reminder_timer.schedule(key, next_occurrence(reminder['timezone'], reminder['time']))
+
+        user_message = f'You will be reminded at {hour:02d}:{minute:02d} ({timezone_name}) by {"DM" if delivery is ReminderDelivery.DM else "mention"} until you submit your solution of the day.'
+        log_message = f'User {user} ({user.id}) set a personal reminder at {hour:02d}:{minute:02d} ({timezone_name}, {delivery.value}) in guild {guild.id}.'
+        return user_message, log_message
+
+    def remove_personal_reminder(self, guild_id: int, user_id: int) -> bool:
+        key = PersonalReminderDict.make_key(guild_id, user_id)
+        self.reminder_timer.cancel(key)
+        if key not in self.personal_reminders:
+            return False
+        del self.personal_reminders[key]
+        return True
+
+    def clear_personal_reminder(self, guild: discord.Guild, user: discord.Member) -> Tuple[str, str]:
+        if self.remove_personal_reminder(guild.id, user.id):
+            user_message = 'Your personal reminder has been removed.'
+            log_message = f'User {user} ({user.id}) removed their personal reminder in guild {guild.id}.'
+        else:
+            user_message = 'You have no personal reminder.'
+            log_message = f'User {user} ({user.id}) tried to remove their personal reminder in guild {guild.id} but had none.'
+        return user_message, log_message
+
+    def schedule_personal_reminders(self, keys):
+        # reminders sharing a timezone and time share the computation of their next occurrence
+        due_times = {}
+        for key in keys:
+            reminder = self.personal_reminders.get(key)
+            if reminder is None:
+                continue
+            due = due_times.get((reminder['timezone'], reminder['time']))
+            if due is None:
+                due = due_times[(reminder['timezone'], reminder['time'])] = next_occurrence(reminder['timezone'], reminder['time'])
+            self.reminder_timer.schedule(key, due)
+
+    async def deliver_personal_reminders(self, keys: List[str]):
+        # the next day is scheduled before the delivery so that a failure never drops a reminder
+        self.schedule_personal_reminders(keys)
+        user_ids_by_guild = {}
+        for key in keys:
+            guild_id, user_id = PersonalReminderDict.split_key(key)
+            user_ids_by_guild.setdefault(guild_id, []).append(user_id)
+
+        items = [
+            (guild_id, lambda guild_id=guild_id, user_ids=user_ids: self.send_personal_reminders(guild_id, user_ids))
+            for guild_id, user_ids in user_ids_by_guild.items() if guild_id in self.guilds
+        ]
+
+        report = await self.fanout.run('personal remind', items)
+        for guild_id, error in report.failed.items():
+            self.bot.logger.error(f'Leetcode: Failed to send personal reminders in guild {guild_id}: {error}')
+        self.bot.logger.info(
+            f'Leetcode: Personal reminders for {len(keys)} users in {report.total} guilds finished '
+            f'({report.done} done, {len(report.failed)} failed, {report.messages} messages) in {report.duration:.3f}s'
+        )
+
+    async def send_personal_reminders(self, guild_id: int, user_ids: List[int]):
+        if not self.guilds[guild_id].config['daily_challenge_status']:
+            return
+        guild = self.bot.get_guild(guild_id)
+        if guild is None:
+            # the bot has left the guild
+            return
+        daily_report = self.guilds[guild_id].daily_report
+        content = "Today's leetcode daily coding challenge is still waiting for your solution."
+        mentions = []
+        for user_id in user_ids:
+            # submitted today, or no longer a participant
+            if daily_report.get(user_id) != 0:
+                continue
+            member = guild.get_member(user_id)
+            reminder = self.personal_reminders.get(PersonalReminderDict.make_key(guild_id, user_id))
+            if member is None or reminder is None:
+                continue
+            if reminder['delivery'] == ReminderDelivery.DM.value:
+                try:
+                    await self.fanout.send(member, f'{content} ({guild.name})')
+                except discord.Forbidden:
+                    # the member does not accept direct messages, fall back to a mention
+                    mentions.append(member.mention)
+            else:
+                mentions.append(member.mention)
+        if not mentions:
+            return
+        leetcode_channel = guild.get_channel(self.guilds[guild_id].config['leetcode_channel_id'])
+        if leetcode_channel is None:
+            return
+        # mentions are split over as many messages as the message length limit requires
+        message = content + '\n'
+        for mention in mentions:
+            if len(message) + len(mention) > self.MESSAGE_LENGTH_LIMIT:
+                await self.fanout.send(leetcode_channel, message)
+                message = ''
+            message += mention
+        await self.fanout.send(leetcode_channel, message)
+
     def get_participants(self, guild: discord.Guild):
         if guild.id not in self.guilds:
             raise ModuleCommandException(
@@ -496,51 +1030,26 @@ class Leetcode:
 
         return user_message, log_message
 
-    def get_daily_coding_challenge(self, use_cache: bool = True) -> discord.Embed:
-        if use_cache and self.daily_coding_challenge_cache:
-            result = self.daily_coding_challenge_cache
+    async def fetch_daily_coding_challenge(self) -> dict:
+        try:
+            # every scheduled start job waits for this fetch, let it jump ahead of user lookups
+            response = await self.client.query(QUERIES['daily_challenge'], priority=RequestPriority.SCHEDULED, hedge=True)
+        except LeetcodeRequestError as e:
+            raise ModuleCommandException(
+                log_message=f'Failed to get daily coding challenge: {e}.',
+                user_message='Failed to get daily coding challenge due to request error.',
+                module_name=self.module_data_dir_name
+            )
+        return response['data']['activeDailyCodingChallengeQuestion']
+
+    async def get_daily_coding_challenge(self, use_cache: bool = True) -> discord.Embed:
+        if use_cache:
+            result = await self.daily_challenges.get_or_stale()
         else:
-            post_url = self.url + "/graphql"
-            data = {
-                "query": "query questionOfToday \
-                    {\
-                        activeDailyCodingChallengeQuestion\
-                            {\
-                                date\
-                                userStatus\
-                                link\
-                                question{\
-                                    questionId\
-                                    questionFrontendId\
-                                    title\
-                                    titleSlug\
-                                    acRate\
-                                    difficulty\
-                                    freqBar\
-                                    likes\
-                                    dislikes\
-                                    content\
-                                    similarQuestions\
-                                    isFavor\
-                                    paidOnly: isPaidOnly\
-                                    status\
-                                    hasVideoSolution\
-                                    hasSolution\
-                                    topicTags {name id slug}\
-                            }\
-                    }\
-                }",
-                "operationName": "questionOfToday"
-            }
-            result = requests.post(post_url, json=data)
-            if not result.ok:
-                raise ModuleCommandException(
-                    log_message=f'Failed to get daily coding challenge: Status code: {result.status_code} Reason: {result.reason}.',
-                    user_message='Failed to get daily coding challenge due to request error.',
-                    module_name=self.module_data_dir_name
-                )
-            result = requests.post(post_url, json=data).json()['data']['activeDailyCodingChallengeQuestion']
-            self.daily_coding_challenge_cache = result
+            result = await self.daily_challenges.get(force=True)
+        return self.generate_daily_coding_challenge_embed(result)
+
+    def generate_daily_coding_challenge_embed(self, result: dict) -> discord.Embed:
         question_date = result['date']
         question_id = result['question']['questionFrontendId']
         title = result['question']['title']
@@ -549,7 +1058,6 @@ class Leetcode:
         difficulty = result['question']['difficulty']
         likes = result['question']['likes']
         dislikes = result['question']['dislikes']
-        content = result['question']['content']
         paid_only = result['question']['paidOnly']
         has_solution = result['question']['hasSolution']
         solution_link = question_link + "solution/"
@@ -645,54 +1153,53 @@ class Leetcode:
 
         return embed
 
-    def get_question_by_id(self, question_id : int) -> discord.Embed:
-        get_url = self.url + "/api/problems/all/"
-        result = requests.get(get_url).json()
-        problems = list(
-            map(
-                lambda x: {
-                    "frontend_question_id": x['stat']['frontend_question_id'],
-                    "title_slug": x['stat']['question__title_slug']
-                },
-                sorted(
-                    result['stat_status_pairs'],
-                    key=lambda x: x['stat']['frontend_question_id']
-                )
+    async def get_question(self, title_slug: str) -> dict:
+        question = self.question_cache.get(title_slug)
+        if question is not None:
+            if self.question_cache.is_stale(title_slug, 'volatile') and title_slug not in self.pending_question_refreshes:
+                self.pending_question_refreshes.add(title_slug)
+                self.run_in_background(self.refresh_question_stats(title_slug))
+            return question
+
+        try:
+            response = await self.client.query(QUERIES['question'], {"titleSlug": title_slug}, hedge=True)
+        except LeetcodeRequestError as e:
+            # serve the expired question rather than nothing while leetcode is unavailable
+            question = self.question_cache.get(title_slug, allow_expired=True)
+            if question is not None:
+                self.bot.logger.warning(f'Leetcode: Serving expired question {title_slug}: {e}')
+                return question
+            raise ModuleCommandException(
+                log_message=f'Failed to get question {title_slug}: {e}.',
+                user_message='Failed to get question due to request error.',
+                module_name=self.module_data_dir_name
             )
-        )
-        if question_id > len(problems):
-            return None
-        title_slug = problems[question_id - 1]['title_slug']
-        post_url = self.url + "/graphql"
-        data = {
-            "operationName": "questionData",
-            "variables": {
-                "titleSlug": title_slug
-            },
-            "query":
-            "query questionData($titleSlug: String!){\
-                question(titleSlug: $titleSlug) {\
-                    questionId\
-                    questionFrontendId\
-                    title\
-                    titleSlug\
-                    acRate\
-                    difficulty\
-                    freqBar\
-                    likes\
-                    dislikes\
-                    content\
-                    similarQuestions\
-                    isFavor\
-                    paidOnly: isPaidOnly\
-                    status\
-                    hasVideoSolution\
-                    hasSolution\
-                    topicTags {name id slug}\
-                }\
-            }"
-        }
-        result = requests.post(post_url, json=data).json()['data']['question']
+        question = response['data']['question']
+        question['similarQuestions'] = json.loads(question['similarQuestions'])
+        self.question_cache.put(title_slug, question)
+        return question
+
+    async def refresh_question_stats(self, title_slug: str):
+        try:
+            response = await self.client.query(QUERIES['question_stats'], {"titleSlug": title_slug}, priority=RequestPriority.BACKGROUND)
+            self.question_cache.update(title_slug, 'volatile', response['data']['question'])
+        except LeetcodeRequestError as e:
+            self.bot.logger.warning(f'Leetcode: Failed to refresh stats of question {title_slug}: {e}')
+        finally:
+            self.pending_question_refreshes.discard(title_slug)
+
+    async def get_question_by_id(self, question_id : int) -> discord.Embed:
+        # unknown ids may be newly released problems, refresh the catalog at most once per minute for them
+        if question_id not in self.catalog and time.time() - self.catalog.updated_at > 60:
+            await self.refresh_catalog()
+        question = self.catalog.get_by_id(question_id)
+        if question is None:
+            raise ModuleCommandException(
+                log_message=f'Question {question_id} does not exist in the problem catalog.',
+                user_message=f'Question {question_id} does not exist.',
+                module_name=self.module_data_dir_name
+            )
+        result = await self.get_question(question['title_slug'])
         question_id = result['questionFrontendId']
         title = result['title']
         question_link = self.url + "/problems/" + result['titleSlug'] + "/"
@@ -700,12 +1207,11 @@ class Leetcode:
         difficulty = result['difficulty']
         likes = result['likes']
         dislikes = result['dislikes']
-        content = result['content']
         paid_only = result['paidOnly']
         has_solution = result['hasSolution']
         solution_link = question_link + "solution/"
         topics_tags = result['topicTags']
-        similar_questions = json.loads(result['similarQuestions'])
+        similar_questions = result['similarQuestions']
 
         embed = discord.Embed()
 
@@ -784,8 +1290,7 @@ class Leetcode:
         return embed
     
     def get_info(self, guild: discord.Guild):
-        guild_module_data_dir_path = os.path.join(self.data_dir_path, str(guild.id), self.module_data_dir_name)
-        if not os.path.exists(guild_module_data_dir_path):
+        if guild.id not in self.guilds:
             raise ModuleCommandException(
                 log_message=f'Guild {guild.id} has not been initialized.',
                 user_message='Guild has not been initialized.',
@@ -799,107 +1304,102 @@ class Leetcode:
         start_time = self.guilds[guild.id].config['start_time']
         end_time = self.guilds[guild.id].config['end_time']
         remind_time = self.guilds[guild.id].config['remind_time']
-        session_cookie = list(filter(lambda x: x.name == 'LEETCODE_SESSION', self.leetcode_session.cookies))
-        cookie_status = 'undefined'
-        cookie_expire_time = 'Undefined'
-        if session_cookie:
-            session_cookie = session_cookie[0]
-            if session_cookie.expires is None:
-                cookie_status = 'Invalid'
-                cookie_expire_time = 'Unknown'
-            elif datetime.fromtimestamp(session_cookie.expires) <= datetime.now():
-                cookie_status = 'Expired'
-                cookie_expire_time = datetime.fromtimestamp(session_cookie.expires).strftime('%Y-%m-%d %H:%M:%S')
-            else:
-                cookie_status = 'Valid'
-                cookie_expire_time = datetime.fromtimestamp(session_cookie.expires).strftime('%Y-%m-%d %H:%M:%S')
+        cookie_status = self.cookie_validator.status.value
+        cookie_expire_time = 'Undefined' if self.cookie_validator.status is CookieStatus.UNDEFINED else self.cookie_validator.expire_time
 
         user_message = f'Cookie status: {cookie_status} (Expiration time: {cookie_expire_time})'
         user_message += f'\nLeetcode role: {leetcode_role.mention}'
         user_message += f'\nLeetcode channel: {leetcode_channel.mention}'
         user_message += f'\nTotal members: {len(leetcode_role.members)}'
+
+        request_stats = self.client.rate_limiter.stats()
+        queue_depth = ', '.join(f'{priority}: {depth}' for priority, depth in request_stats['queue_depth'].items())
+        user_message += f'\nLeetcode request queue: {queue_depth} (average wait: {request_stats["average_wait"]:.2f}s, max wait: {request_stats["max_wait"]:.2f}s)'
+        if self.client.circuit_breakers:
+            circuit_states = ', '.join(f'{endpoint}: {circuit_breaker.state.value}' for endpoint, circuit_breaker in self.client.circuit_breakers.items())
+            user_message += f'\nLeetcode endpoints: {circuit_states}'
+        payload_summary = self.client.payload_summary()
+        if payload_summary:
+            payloads = ', '.join(f'{operation}: {stats["average_bytes"] / 1024:.1f}KB in {stats["average_parse_time"] * 1000:.2f}ms' for operation, stats in payload_summary.items())
+            user_message += f'\nLeetcode average payloads: {payloads}'
+        guild_file_stats = get_io_stats().get(os.path.dirname(self.guilds[guild.id].config.file_path)) if self.database is None else None
+        if guild_file_stats is not None:
+            user_message += f'\nData files: {guild_file_stats["count"]} writes of {guild_file_stats["average_bytes"] / 1024:.1f}KB serialized in {guild_file_stats["average_serialize_time"] * 1000:.2f}ms, written in {guild_file_stats["average_write_time"] * 1000:.2f}ms'
         
         if daily_challenge_status:
             user_message += f'\nDaily timezone: {daily_challenge_timezone}'
-            user_message += f'\nDaily start time: {":".join(start_time.values())}'
-            user_message += f'\nDaily end time: {":".join(end_time.values())}'
-            user_message += f'\nDaily remind time: {":".join(remind_time.values())}'
+            user_message += f'\nDaily start time: {format_time(start_time)}'
+            user_message += f'\nDaily end time: {format_time(end_time)}'
+            user_message += f'\nDaily remind time: {format_time(remind_time)}'
         else:
             user_message += '\nDaily challenge: disabled'
         
         return user_message
 
-    def get_submission(self, guild: discord.Guild, submission_id: int) -> discord.Embed:
-        post_url = self.url + "/graphql"
-        data = {
-            "operationName": "submissionDetails",
-            "query":
-            "query submissionDetails($submissionId: Int!){\
-                submissionDetails(submissionId: $submissionId) {\
-                    runtime\
-                    runtimeDisplay\
-                    runtimePercentile\
-                    runtimeDistribution\
-                    memory\
-                    memoryDisplay\
-                    memoryPercentile\
-                    memoryDistribution\
-                    code\
-                    timestamp\
-                    statusCode\
-                    user {\
-                        username\
-                        profile {realName userAvatar}\
-                    }\
-                    lang {\
-                        name\
-                        verboseName\
-                    }\
-                    question {\
-                        questionId\
-                        questionFrontendId\
-                        title\
-                        difficulty\
-                        paidOnly: isPaidOnly\
-                    }\
-                    notes\
-                    topicTags {\
-                        tagId\
-                        slug\
-                        name\
-                    }\
-                    runtimeError\
-                    compileError\
-                    lastTestcase\
-                }\
-            }",
-            "variables": {
-                "submissionId": submission_id
-            },
-        }
-        response = self.leetcode_session.post(post_url, json=data)
-        
-        if not response:
+    def get_scheduler_stats(self) -> str:
+        user_message = f'Scheduled guilds: {self.schedules.guild_count()} in {len(self.schedules)} jobs (concurrency: {self.fanout.concurrency})'
+        user_message += f'\nPending personal reminders: {len(self.reminder_timer)}'
+        snapshot = self.scheduler_metrics.snapshot()
+        if not snapshot['phases']:
+            return user_message + '\nNo phase has run yet.'
+
+        def seconds(value: Optional[float]) -> str:
+            return '-' if value is None else f'{value:.3f}s'
+
+        for phase, stats in snapshot['phases'].items():
+            lag = stats['lag']
+            duration = stats['duration']
+            send_latency = stats['send_latency']
+            user_message += (
+                f'\n{phase.capitalize()}: {stats["runs"]} runs, {duration["count"]} guild runs, {stats["failures"]} failures'
+                f'\n  lag p50 {seconds(lag["p50"])}, p95 {seconds(lag["p95"])}, max {seconds(lag["max"] if lag["count"] else None)}'
+                f'\n  duration p50 {seconds(duration["p50"])}, p95 {seconds(duration["p95"])}, max {seconds(duration["max"] if duration["count"] else None)}'
+                f'\n  send latency p50 {seconds(send_latency["p50"])}, p95 {seconds(send_latency["p95"])}, max {seconds(send_latency["max"] if send_latency["count"] else None)}'
+            )
+        recent_failures = snapshot['recent_failures'][-5:]
+        if recent_failures:
+            user_message += '\nRecent failures:'
+            for failure in recent_failures:
+                user_message += f'\n  {failure["phase"]} in guild {failure["guild_id"]} at {datetime.fromtimestamp(failure["time"]).isoformat(timespec="seconds")}: {failure["error"]}'
+        return user_message
+
+    async def fetch_submission(self, submission_id: int) -> dict:
+        try:
+            result = await self.client.query(QUERIES['submission'], {"submissionId": submission_id}, hedge=True)
+        except LeetcodeRequestError as e:
+            if e.status in (401, 403):
+                self.request_cookie_validation()
             raise ModuleCommandException(
-                log_message=f'Failed to get submission {submission_id}: Status code: {response.status_code} Reason: {response.reason}.',
+                log_message=f'Failed to get submission {submission_id}: {e}.',
                 user_message='Failed to get submission due to request error.',
                 module_name=self.module_data_dir_name
             )
         
-        result = response.json()
-        
         if 'errors' in result:
+            # leetcode hides submissions from signed out users behind errors or null details
+            self.request_cookie_validation()
             raise ModuleCommandException(
                 log_message=f'Failed to get submission {submission_id} due to error: {result["errors"][0]["message"]}.',
                 user_message=f'Failed to get submission due to invalid submission id {submission_id}.',
                 module_name=self.module_data_dir_name
             )
         
-        data = result['data']['submissionDetails']
+        if result['data']['submissionDetails'] is None:
+            self.request_cookie_validation()
+            raise ModuleCommandException(
+                log_message=f'Failed to get submission {submission_id}: submission is not accessible.',
+                user_message=f'Failed to get submission {submission_id} because it is not accessible.',
+                module_name=self.module_data_dir_name
+            )
+        
+        return result['data']['submissionDetails']
+
+    async def get_submission(self, guild: discord.Guild, submission_id: int) -> discord.Embed:
+        data = await self.submission_cache.get(submission_id, lambda: self.fetch_submission(submission_id))
 
         question_id = data['question']['questionFrontendId']
         question_title = data['question']['title']
-        question_link = self.url + self.daily_coding_challenge_cache['link']
+        question_link = self.url + "/problems/" + data['question']['titleSlug'] + "/"
         question_difficulty = data['question']['difficulty']
         question_paid_only = data['question']['paidOnly']
         submission_runtime_display = data['runtimeDisplay']
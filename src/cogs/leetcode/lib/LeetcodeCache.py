@@ -0,0 +1,346 @@
+#!/usr/bin/env python
+# -*-coding:utf-8 -*-
+'''
+@File      :    LeetcodeCache.py
+@Time      :    2023/07/02
+@Author    :    Feiyu Zheng
+@Version   :    1.0
+@Contact   :    feiyuzheng98@gmail.com
+@License   :    Copyright (c) 2023-present Feiyu Zheng. All rights reserved.
+                This work is licensed under the terms of the MIT license.
+                For a copy, see <https://opensource.org/licenses/MIT>.
+@Desc      :    None
+'''
+
+import asyncio
+from collections import OrderedDict
+import os
+import time
+from typing import Any, Awaitable, Callable, Iterator, List, Optional, Tuple
+
+from utils.io_utils import dump_data, dump_data_async, forget, io_executor, load_data
+
+class LRUCache:
+    __slots__ = ('maxsize', '_data')
+
+    def __init__(self, maxsize: int = 1024):
+        """A bounded mapping evicting the least recently used key
+
+        Args:
+            maxsize (int, optional): maximum number of keys. Defaults to 1024.
+        """
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __contains__(self, key) -> bool:
+        return key in self._data
+
+    def get(self, key, default: Any = None) -> Any:
+        if key not in self._data:
+            return default
+        self._data.move_to_end(key)
+        return self._data[key]
+
+    def set(self, key, value) -> None:
+        self._data[key] = value
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def pop(self, key, default: Any = None) -> Any:
+        return self._data.pop(key, default)
+
+    def items(self) -> Iterator[Tuple[Any, Any]]:
+        """Iterate from the least to the most recently used item"""
+        return iter(self._data.items())
+
+class QuestionCache:
+    __slots__ = ('file_path', 'ttls', 'dirty', '_entries')
+
+    FIELD_GROUPS = {
+        'static': ('questionFrontendId', 'title', 'titleSlug', 'difficulty', 'paidOnly', 'hasSolution', 'topicTags', 'similarQuestions'),
+        'volatile': ('likes', 'dislikes', 'acRate')
+    }
+
+    def __init__(
+        self,
+        file_path: str,
+        maxsize: int = 512,
+        static_ttl: float = 7 * 24 * 60 * 60,
+        volatile_ttl: float = 60 * 60
+    ):
+        """An LRU cache of question details keyed by title slug with a ttl per field group
+
+        Args:
+            file_path (str): snapshot file path
+            maxsize (int, optional): maximum number of cached questions. Defaults to 512.
+            static_ttl (float, optional): seconds before the static fields expire. Defaults to 7 days.
+            volatile_ttl (float, optional): seconds before likes, dislikes and acRate go stale. Defaults to 1 hour.
+        """
+        self.file_path = file_path
+        self.ttls = {'static': static_ttl, 'volatile': volatile_ttl}
+        self.dirty = False
+        self._entries = LRUCache(maxsize)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, title_slug: str, allow_expired: bool = False) -> Optional[dict]:
+        """Get a cached question
+
+        Expired questions are kept until they are evicted or replaced so that they can still be served while leetcode is unavailable.
+
+        Args:
+            title_slug (str): question title slug
+            allow_expired (bool, optional): return the question even if its static fields have expired. Defaults to False.
+
+        Returns:
+            Optional[dict]: question, None if missing or expired
+        """
+        entry = self._entries.get(title_slug)
+        if entry is None:
+            return None
+        if not allow_expired and self.is_stale(title_slug, 'static'):
+            return None
+        return entry['question']
+
+    def is_stale(self, title_slug: str, field_group: str) -> bool:
+        entry = self._entries.get(title_slug)
+        if entry is None:
+            return True
+        return time.time() - entry['fetched_at'][field_group] > self.ttls[field_group]
+
+    def put(self, title_slug: str, question: dict) -> None:
+        now = time.time()
+        self._entries.set(title_slug, {
+            'question': question,
+            'fetched_at': {field_group: now for field_group in self.FIELD_GROUPS}
+        })
+        self.dirty = True
+
+    def update(self, title_slug: str, field_group: str, fields: dict) -> None:
+        """Update the fields of a single field group of a cached question
+
+        Args:
+            title_slug (str): question title slug
+            field_group (str): field group the fields belong to
+            fields (dict): new field values
+        """
+        entry = self._entries.get(title_slug)
+        if entry is None:
+            return
+        entry['question'].update({k: fields[k] for k in self.FIELD_GROUPS[field_group] if k in fields})
+        entry['fetched_at'][field_group] = time.time()
+        self.dirty = True
+
+    def load(self) -> None:
+        """Load the snapshot from file if it exists"""
+        if not os.path.exists(self.file_path):
+            return
+        data = load_data(self.file_path)
+        if not data:
+            return
+        for title_slug, entry in data.items():
+            self._entries.set(title_slug, entry)
+        self.dirty = False
+
+    def dump(self) -> None:
+        """Write the snapshot to file if anything changed since the last dump"""
+        if not self.dirty:
+            return
+        dump_data(data=dict(self._entries.items()), file_path=self.file_path)
+        self.dirty = False
+
+    async def dump_async(self) -> None:
+        """Write the snapshot to file on the io thread pool if anything changed since the last dump"""
+        if not self.dirty:
+            return
+        self.dirty = False
+        await dump_data_async(data=dict(self._entries.items()), file_path=self.file_path)
+
+class SubmissionCache:
+    __slots__ = ('dir_path', 'max_disk_entries', 'max_disk_age', '_memory', '_disk_index', '_in_flight')
+
+    # statusCode of the judged results, a pending submission has none of them yet
+    JUDGED_STATUS_CODES = frozenset((10, 11, 12, 13, 14, 15, 16, 20))
+
+    def __init__(self, dir_path: Optional[str] = None, maxsize: int = 256, max_disk_entries: int = 4096, max_disk_age: Optional[float] = 30 * 24 * 60 * 60):
+        """A cache of judged submission details with a memory LRU tier and an optional bounded disk tier
+
+        Concurrent lookups of the same uncached submission share a single fetch. The disk tier
+        is read and written on the io thread pool and drops its oldest files beyond
+        max_disk_entries or max_disk_age.
+
+        Args:
+            dir_path (Optional[str], optional): directory of the disk tier, None to disable it. Defaults to None.
+            maxsize (int, optional): maximum number of submissions kept in memory. Defaults to 256.
+            max_disk_entries (int, optional): maximum number of submission files. Defaults to 4096.
+            max_disk_age (Optional[float], optional): seconds a submission file is kept, forever if None. Defaults to 30 days.
+        """
+        self.dir_path = dir_path
+        self.max_disk_entries = max_disk_entries
+        self.max_disk_age = max_disk_age
+        self._memory = LRUCache(maxsize)
+        # submission id -> write time of its file, oldest first
+        self._disk_index = OrderedDict()
+        self._in_flight = {}
+        if dir_path is not None:
+            os.makedirs(dir_path, exist_ok=True)
+            files = []
+            for entry in os.scandir(dir_path):
+                name, ext = os.path.splitext(entry.name)
+                if ext == '.json' and name.isdigit():
+                    files.append((entry.stat().st_mtime, int(name)))
+            for mtime, submission_id in sorted(files):
+                self._disk_index[submission_id] = mtime
+
+    def __contains__(self, submission_id: int) -> bool:
+        return submission_id in self._memory or submission_id in self._disk_index
+
+    def _file_path(self, submission_id: int) -> str:
+        return os.path.join(self.dir_path, f'{submission_id}.json')
+
+    @classmethod
+    def is_judged(cls, submission: dict) -> bool:
+        return submission.get('statusCode') in cls.JUDGED_STATUS_CODES
+
+    async def get_cached(self, submission_id: int) -> Optional[dict]:
+        submission = self._memory.get(submission_id)
+        if submission is not None or submission_id not in self._disk_index:
+            return submission
+        submission = await asyncio.get_running_loop().run_in_executor(io_executor, load_data, self._file_path(submission_id))
+        if submission is not None:
+            self._memory.set(submission_id, submission)
+        return submission
+
+    async def put(self, submission_id: int, submission: dict) -> None:
+        self._memory.set(submission_id, submission)
+        if self.dir_path is None:
+            return
+        await dump_data_async(data=submission, file_path=self._file_path(submission_id), fsync=False)
+        self._disk_index[submission_id] = time.time()
+        self._disk_index.move_to_end(submission_id)
+        await self._prune_disk()
+
+    async def _prune_disk(self) -> None:
+        expired = []
+        deadline = None if self.max_disk_age is None else time.time() - self.max_disk_age
+        while self._disk_index:
+            submission_id, mtime = next(iter(self._disk_index.items()))
+            if len(self._disk_index) <= self.max_disk_entries and (deadline is None or mtime >= deadline):
+                break
+            del self._disk_index[submission_id]
+            expired.append(self._file_path(submission_id))
+        if expired:
+            await asyncio.get_running_loop().run_in_executor(io_executor, _remove_files, expired)
+
+    async def get(self, submission_id: int, fetch: Callable[[], Awaitable[dict]]) -> dict:
+        """Get a submission from the cache or fetch it once for all concurrent callers
+
+        Args:
+            submission_id (int): submission id
+            fetch (Callable[[], Awaitable[dict]]): coroutine function fetching the submission on a miss
+
+        Returns:
+            dict: submission details
+        """
+        submission = await self.get_cached(submission_id)
+        if submission is not None:
+            return submission
+
+        future = self._in_flight.get(submission_id)
+        if future is None:
+            future = asyncio.ensure_future(self._fetch(submission_id, fetch))
+            self._in_flight[submission_id] = future
+            future.add_done_callback(lambda _: self._in_flight.pop(submission_id, None))
+        # shield the shared fetch so that one cancelled caller does not cancel it for the others
+        return await asyncio.shield(future)
+
+    async def _fetch(self, submission_id: int, fetch: Callable[[], Awaitable[dict]]) -> dict:
+        submission = await fetch()
+        # a submission still being judged would be served stale forever
+        if self.is_judged(submission):
+            await self.put(submission_id, submission)
+        return submission
+
+def _remove_files(file_paths: List[str]) -> None:
+    for file_path in file_paths:
+        try:
+            os.remove(file_path)
+        except FileNotFoundError:
+            pass
+        forget(file_path)
+
+class GuildCache:
+    __slots__ = ('loader', 'max_resident', 'guild_ids', '_resident')
+
+    def __init__(self, loader: Callable[[int], Any], max_resident: Optional[int] = None):
+        """A mapping of guild id to guild data that loads a guild on first access and evicts the least recently used ones
+
+        Membership only tests whether a guild has stored data and never loads it. An evicted
+        guild is flushed first so that its next access reloads its latest data.
+
+        Args:
+            loader (Callable[[int], Any]): loads the guild data of a guild id, the data has to provide flush()
+            max_resident (Optional[int], optional): maximum number of loaded guilds, unbounded if None. Defaults to None.
+        """
+        self.loader = loader
+        self.max_resident = max_resident
+        self.guild_ids = set()
+        self._resident = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self.guild_ids)
+
+    def __contains__(self, guild_id: int) -> bool:
+        return guild_id in self.guild_ids
+
+    def __iter__(self) -> Iterator[int]:
+        return iter(self.guild_ids)
+
+    def __getitem__(self, guild_id: int) -> Any:
+        guild = self._resident.get(guild_id)
+        if guild is not None:
+            self._resident.move_to_end(guild_id)
+            return guild
+        if guild_id not in self.guild_ids:
+            raise KeyError(guild_id)
+        guild = self.loader(guild_id)
+        self._resident[guild_id] = guild
+        self._evict()
+        return guild
+
+    def __setitem__(self, guild_id: int, guild: Any) -> None:
+        self.guild_ids.add(guild_id)
+        self._resident[guild_id] = guild
+        self._resident.move_to_end(guild_id)
+        self._evict()
+
+    def __delitem__(self, guild_id: int) -> None:
+        self.guild_ids.remove(guild_id)
+        self._resident.pop(guild_id, None)
+
+    def add(self, guild_id: int) -> None:
+        """Register a guild with stored data without loading it"""
+        self.guild_ids.add(guild_id)
+
+    def is_resident(self, guild_id: int) -> bool:
+        return guild_id in self._resident
+
+    def resident_items(self) -> Iterator[Tuple[int, Any]]:
+        """Iterate over the loaded guilds from the least to the most recently used"""
+        return iter(list(self._resident.items()))
+
+    def evict(self, guild_id: int) -> None:
+        """Flush a loaded guild and drop it from memory"""
+        guild = self._resident.pop(guild_id, None)
+        if guild is not None:
+            guild.flush()
+
+    def _evict(self) -> None:
+        while self.max_resident is not None and len(self._resident) > self.max_resident:
+            guild_id = next(iter(self._resident))
+            self.evict(guild_id)
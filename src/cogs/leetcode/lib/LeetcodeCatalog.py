@@ -0,0 +1,104 @@
+#!/usr/bin/env python
+# -*-coding:utf-8 -*-
+'''
+@File      :    LeetcodeCatalog.py
+@Time      :    2023/07/02
+@Author    :    Feiyu Zheng
+@Version   :    1.0
+@Contact   :    feiyuzheng98@gmail.com
+@License   :    Copyright (c) 2023-present Feiyu Zheng. All rights reserved.
+                This work is licensed under the terms of the MIT license.
+                For a copy, see <https://opensource.org/licenses/MIT>.
+@Desc      :    None
+'''
+
+import os
+import time
+from typing import Optional
+
+from cogs.leetcode.lib.LeetcodeClient import LeetcodeClient
+from cogs.leetcode.lib.LeetcodeRateLimiter import RequestPriority
+from utils.io_utils import dump_data, dump_data_async, load_data
+
+class LeetcodeCatalog:
+    __slots__ = ('client', 'file_path', 'updated_at', '_by_id', '_by_slug')
+
+    def __init__(self, client: LeetcodeClient, file_path: str):
+        """A persistent index of all leetcode problems keyed by frontend id and title slug
+
+        Args:
+            client (LeetcodeClient): client used to download the problem list
+            file_path (str): catalog file path
+        """
+        self.client = client
+        self.file_path = file_path
+        self.updated_at = 0.0
+        self._by_id = {}
+        self._by_slug = {}
+
+    def __len__(self) -> int:
+        return len(self._by_id)
+
+    def __contains__(self, question_id: int) -> bool:
+        return question_id in self._by_id
+
+    def get_by_id(self, question_id: int) -> Optional[dict]:
+        return self._by_id.get(question_id)
+
+    def get_by_slug(self, title_slug: str) -> Optional[dict]:
+        question_id = self._by_slug.get(title_slug)
+        return None if question_id is None else self._by_id[question_id]
+
+    def load(self) -> None:
+        """Load the catalog from file if it exists"""
+        if not os.path.exists(self.file_path):
+            return
+        data = load_data(self.file_path)
+        if not data:
+            return
+        self.updated_at = data.get('updated_at', 0.0)
+        self._by_id = {int(k): v for k, v in data['questions'].items()}
+        self._by_slug = {v['title_slug']: k for k, v in self._by_id.items()}
+
+    def dump(self) -> None:
+        dump_data(
+            data={'updated_at': self.updated_at, 'questions': self._by_id},
+            file_path=self.file_path
+        )
+
+    async def dump_async(self) -> None:
+        """Write the catalog to file on the io thread pool"""
+        await dump_data_async(
+            data={'updated_at': self.updated_at, 'questions': self._by_id},
+            file_path=self.file_path
+        )
+
+    async def refresh(self) -> int:
+        """Download the problem list and merge the new or changed problems into the catalog
+
+        Returns:
+            int: number of problems added or changed
+        """
+        result = await self.client.get("/api/problems/all/", priority=RequestPriority.BACKGROUND)
+        changed = 0
+        for pair in result['stat_status_pairs']:
+            question_id = pair['stat']['frontend_question_id']
+            entry = {
+                'title_slug': pair['stat']['question__title_slug'],
+                'title': pair['stat']['question__title'],
+                'difficulty': pair['difficulty']['level'],
+                'paid_only': pair['paid_only']
+            }
+            previous = self._by_id.get(question_id)
+            if previous == entry:
+                continue
+            if previous is not None and self._by_slug.get(previous['title_slug']) == question_id:
+                del self._by_slug[previous['title_slug']]
+            self._by_id[question_id] = entry
+            self._by_slug[entry['title_slug']] = question_id
+            changed += 1
+
+        self.updated_at = time.time()
+        if changed:
+            await self.dump_async()
+        return changed
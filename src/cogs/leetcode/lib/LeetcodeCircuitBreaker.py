@@ -0,0 +1,107 @@
+#!/usr/bin/env python
+# -*-coding:utf-8 -*-
+'''
+@File      :    LeetcodeCircuitBreaker.py
+@Time      :    2023/07/03
+@Author    :    Feiyu Zheng
+@Version   :    1.0
+@Contact   :    feiyuzheng98@gmail.com
+@License   :    Copyright (c) 2023-present Feiyu Zheng. All rights reserved.
+                This work is licensed under the terms of the MIT license.
+                For a copy, see <https://opensource.org/licenses/MIT>.
+@Desc      :    None
+'''
+
+from collections import deque
+from enum import Enum
+import time
+from typing import Optional
+
+class CircuitState(str, Enum):
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half open'
+
+class CircuitBreaker:
+    __slots__ = ('failure_threshold', 'recovery_timeout', '_state', '_failures', '_opened_at', '_probe_started_at')
+
+    def __init__(self, failure_threshold: int = 5, recovery_timeout: float = 30.0):
+        """A circuit breaker failing fast after consecutive failures of an endpoint
+
+        After recovery_timeout seconds the circuit lets a single probe request through,
+        which closes it on success and opens it again on failure. A probe that never reports back,
+        e.g. because it was cancelled, is replaced by a new one after another recovery_timeout.
+
+        Args:
+            failure_threshold (int, optional): consecutive failures opening the circuit. Defaults to 5.
+            recovery_timeout (float, optional): seconds before an open circuit is probed. Defaults to 30.0.
+        """
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self._state = CircuitState.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probe_started_at = None
+
+    @property
+    def state(self) -> CircuitState:
+        if self._state is CircuitState.OPEN and time.monotonic() - self._opened_at >= self.recovery_timeout:
+            self._state = CircuitState.HALF_OPEN
+            self._probe_started_at = None
+        return self._state
+
+    def allow(self) -> bool:
+        state = self.state
+        if state is CircuitState.CLOSED:
+            return True
+        if state is CircuitState.HALF_OPEN:
+            now = time.monotonic()
+            if self._probe_started_at is None or now - self._probe_started_at >= self.recovery_timeout:
+                self._probe_started_at = now
+                return True
+        return False
+
+    def record_success(self) -> None:
+        self._state = CircuitState.CLOSED
+        self._failures = 0
+        self._probe_started_at = None
+
+    def record_failure(self) -> None:
+        self._failures += 1
+        if self._state is CircuitState.HALF_OPEN or self._failures >= self.failure_threshold:
+            self._state = CircuitState.OPEN
+            self._opened_at = time.monotonic()
+            self._probe_started_at = None
+
+class LatencyTracker:
+    __slots__ = ('min_samples', '_samples')
+
+    def __init__(self, window: int = 100, min_samples: int = 20):
+        """A sliding window of request latencies
+
+        Args:
+            window (int, optional): number of recent latencies kept. Defaults to 100.
+            min_samples (int, optional): samples required before percentiles are reported. Defaults to 20.
+        """
+        self.min_samples = min_samples
+        self._samples = deque(maxlen=window)
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+    def record(self, latency: float) -> None:
+        self._samples.append(latency)
+
+    def percentile(self, p: float) -> Optional[float]:
+        """Get a latency percentile of the window
+
+        Args:
+            p (float): percentile between 0 and 1
+
+        Returns:
+            Optional[float]: latency in seconds, None if there are not enough samples yet
+        """
+        if len(self._samples) < self.min_samples:
+            return None
+        samples = sorted(self._samples)
+        return samples[min(len(samples) - 1, int(p * len(samples)))]
@@ -0,0 +1,376 @@
+#!/usr/bin/env python
+# -*-coding:utf-8 -*-
+'''
+@File      :    LeetcodeClient.py
+@Time      :    2023/07/02
+@Author    :    Feiyu Zheng
+@Version   :    1.0
+@Contact   :    feiyuzheng98@gmail.com
+@License   :    Copyright (c) 2023-present Feiyu Zheng. All rights reserved.
+                This work is licensed under the terms of the MIT license.
+                For a copy, see <https://opensource.org/licenses/MIT>.
+@Desc      :    None
+'''
+
+import asyncio
+from datetime import datetime, timedelta
+from email.utils import parsedate_to_datetime
+import json as jsonlib
+import random
+import time
+from typing import Optional
+
+import aiohttp
+from yarl import URL
+
+from cogs.leetcode.lib.LeetcodeCircuitBreaker import CircuitBreaker, LatencyTracker
+from cogs.leetcode.lib.LeetcodeQueries import GraphQLQuery
+from cogs.leetcode.lib.LeetcodeRateLimiter import RateLimiter, RequestPriority
+
+class LeetcodeRequestError(Exception):
+    def __init__(self, status: Optional[int], reason: str, retry_after: Optional[float] = None):
+        """Error raised when a request to leetcode fails
+
+        Args:
+            status (Optional[int]): http status code, None if no response was received
+            reason (str): reason of the failure
+            retry_after (Optional[float], optional): seconds leetcode asked to wait before retrying. Defaults to None.
+        """
+        super().__init__(f'Status code: {status} Reason: {reason}')
+        self.status = status
+        self.reason = reason
+        self.retry_after = retry_after
+
+    @property
+    def retryable(self) -> bool:
+        return self.status is None or self.status == 429 or self.status >= 500
+
+    @property
+    def is_failure(self) -> bool:
+        """Whether the error indicates that the endpoint is unhealthy"""
+        return self.status is None or self.status >= 500
+
+class CircuitOpenError(LeetcodeRequestError):
+    def __init__(self, endpoint: str):
+        """Error raised without sending the request while the circuit of an endpoint is open
+
+        Args:
+            endpoint (str): endpoint path
+        """
+        super().__init__(None, f'Circuit breaker of {endpoint} is open')
+        self.endpoint = endpoint
+
+    @property
+    def retryable(self) -> bool:
+        return False
+
+class LeetcodeClient:
+    __slots__ = ('url', 'timeout', 'max_connections', 'keepalive_timeout', 'max_retries', 'backoff_base', 'backoff_max', 'rate_limiter', 'hedge_percentile', 'failure_threshold', 'recovery_timeout', 'circuit_breakers', 'latency_trackers', 'payload_stats', '_cookies', '_session', '_semaphore')
+
+    def __init__(
+        self,
+        url: str = 'https://leetcode.com',
+        timeout: float = 10.0,
+        max_connections: int = 10,
+        max_concurrent_requests: int = 5,
+        keepalive_timeout: float = 30.0,
+        rate: float = 5.0,
+        burst: int = 10,
+        max_retries: int = 3,
+        backoff_base: float = 0.5,
+        backoff_max: float = 30.0,
+        failure_threshold: int = 5,
+        recovery_timeout: float = 30.0,
+        hedge_percentile: float = 0.95
+    ):
+        """An asyncio client sharing one pooled keep-alive session for all leetcode requests
+
+        Args:
+            url (str, optional): leetcode base url. Defaults to 'https://leetcode.com'.
+            timeout (float, optional): default total timeout of a request in seconds. Defaults to 10.0.
+            max_connections (int, optional): size of the connection pool. Defaults to 10.
+            max_concurrent_requests (int, optional): maximum number of in-flight requests. Defaults to 5.
+            keepalive_timeout (float, optional): seconds an idle connection is kept open. Defaults to 30.0.
+            rate (float, optional): requests per second allowed by the rate limiter. Defaults to 5.0.
+            burst (int, optional): requests allowed in a burst by the rate limiter. Defaults to 10.
+            max_retries (int, optional): retries of a throttled or failed request. Defaults to 3.
+            backoff_base (float, optional): base delay of the exponential backoff in seconds. Defaults to 0.5.
+            backoff_max (float, optional): maximum delay of the exponential backoff in seconds. Defaults to 30.0.
+            failure_threshold (int, optional): consecutive failures opening the circuit of an endpoint. Defaults to 5.
+            recovery_timeout (float, optional): seconds before an open circuit is probed again. Defaults to 30.0.
+            hedge_percentile (float, optional): latency percentile after which a hedged request is sent. Defaults to 0.95.
+        """
+        self.url = url
+        self.timeout = timeout
+        self.max_connections = max_connections
+        self.keepalive_timeout = keepalive_timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.rate_limiter = RateLimiter(rate, burst)
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.hedge_percentile = hedge_percentile
+        self.circuit_breakers = {}
+        self.latency_trackers = {}
+        self.payload_stats = {}
+        self._cookies = {}
+        self._session = None
+        self._semaphore = asyncio.Semaphore(max_concurrent_requests)
+
+    @property
+    def session(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self.max_connections,
+                keepalive_timeout=self.keepalive_timeout
+            )
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
+                headers={'Referer': self.url}
+            )
+            if self._cookies:
+                self._session.cookie_jar.update_cookies(self._cookies, URL(self.url))
+        return self._session
+
+    async def close(self) -> None:
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+    def set_cookie(self, name: str, value: str) -> None:
+        if value is None:
+            self._cookies.pop(name, None)
+        else:
+            self._cookies[name] = value
+        if self._session is not None and not self._session.closed:
+            self._session.cookie_jar.clear(lambda morsel: morsel.key == name)
+            if value is not None:
+                self._session.cookie_jar.update_cookies({name: value}, URL(self.url))
+
+    def has_cookie(self, name: str) -> bool:
+        return name in self._cookies
+
+    def get_cookie(self, name: str) -> Optional[str]:
+        return self._cookies.get(name)
+
+    def get_cookie_expiration(self, name: str) -> Optional[datetime]:
+        """Get the expiration time of a cookie set by leetcode
+
+        Args:
+            name (str): cookie name
+
+        Returns:
+            Optional[datetime]: local expiration time, None if the cookie has no known expiration
+        """
+        if self._session is None or self._session.closed:
+            return None
+        morsel = self._session.cookie_jar.filter_cookies(URL(self.url)).get(name)
+        if morsel is None:
+            return None
+        if morsel['max-age']:
+            try:
+                return datetime.now() + timedelta(seconds=int(morsel['max-age']))
+            except ValueError:
+                pass
+        if morsel['expires']:
+            try:
+                return parsedate_to_datetime(morsel['expires']).astimezone().replace(tzinfo=None)
+            except (TypeError, ValueError):
+                pass
+        return None
+
+    def get_circuit_breaker(self, path: str) -> CircuitBreaker:
+        if path not in self.circuit_breakers:
+            self.circuit_breakers[path] = CircuitBreaker(self.failure_threshold, self.recovery_timeout)
+        return self.circuit_breakers[path]
+
+    def get_latency_tracker(self, key: str) -> LatencyTracker:
+        if key not in self.latency_trackers:
+            self.latency_trackers[key] = LatencyTracker()
+        return self.latency_trackers[key]
+
+    async def request(
+        self,
+        method: str,
+        path: str,
+        json: dict = None,
+        timeout: float = None,
+        priority: RequestPriority = RequestPriority.USER,
+        hedge: bool = False,
+        latency_key: str = None
+    ) -> dict:
+        """Send a rate limited request to leetcode and decode the json response
+
+        Throttled, server side and connection failures are retried with exponential backoff and jitter,
+        honoring the Retry-After header of throttled responses. Requests to an endpoint whose circuit is open
+        fail fast without being sent.
+
+        Args:
+            method (str): http method
+            path (str): path relative to the base url
+            json (dict, optional): json body. Defaults to None.
+            timeout (float, optional): total timeout overriding the default one. Defaults to None.
+            priority (RequestPriority, optional): rate limiter priority class. Defaults to RequestPriority.USER.
+            hedge (bool, optional): send a second request if the first one is slower than usual, only for idempotent requests. Defaults to False.
+            latency_key (str, optional): key of the latency statistics. Defaults to the path.
+
+        Raises:
+            CircuitOpenError: the circuit of the endpoint is open
+            LeetcodeRequestError: the request still failed after all retries
+
+        Returns:
+            dict: decoded json response
+        """
+        latency_key = latency_key or path
+        circuit_breaker = self.get_circuit_breaker(path)
+        latency_tracker = self.get_latency_tracker(latency_key)
+        for attempt in range(self.max_retries + 1):
+            if not circuit_breaker.allow():
+                raise CircuitOpenError(path)
+            await self.rate_limiter.acquire(priority)
+            start = time.monotonic()
+            try:
+                if hedge:
+                    result = await self._send_hedged(method, path, json, timeout, latency_key)
+                else:
+                    result = await self._send(method, path, json, timeout, latency_key)
+            except LeetcodeRequestError as e:
+                if e.is_failure:
+                    circuit_breaker.record_failure()
+                else:
+                    circuit_breaker.record_success()
+                if not e.retryable or attempt == self.max_retries:
+                    raise
+                if e.retry_after is not None:
+                    delay = e.retry_after
+                else:
+                    delay = min(self.backoff_max, self.backoff_base * 2 ** attempt)
+                if e.status == 429:
+                    # throttling applies to every request, hold back the whole queue instead of this request only
+                    self.rate_limiter.pause(delay)
+                await asyncio.sleep(delay + random.uniform(0, self.backoff_base))
+            else:
+                circuit_breaker.record_success()
+                latency_tracker.record(time.monotonic() - start)
+                return result
+
+    async def _send_hedged(self, method: str, path: str, json: dict, timeout: float, latency_key: str) -> dict:
+        hedge_delay = self.get_latency_tracker(latency_key).percentile(self.hedge_percentile)
+        if hedge_delay is None:
+            return await self._send(method, path, json, timeout, latency_key)
+
+        primary = asyncio.ensure_future(self._send(method, path, json, timeout, latency_key))
+        pending = {primary}
+        try:
+            done, pending = await asyncio.wait(pending, timeout=hedge_delay)
+            if done:
+                return primary.result()
+            # only hedge when it does not delay other requests waiting for the rate limiter
+            if self.rate_limiter.try_acquire():
+                pending.add(asyncio.ensure_future(self._send(method, path, json, timeout, latency_key)))
+            while True:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        return task.result()
+                if not pending:
+                    # both requests failed
+                    return done.pop().result()
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def _send(self, method: str, path: str, json: dict = None, timeout: float = None, latency_key: str = None) -> dict:
+        request_timeout = aiohttp.ClientTimeout(total=timeout if timeout is not None else self.timeout)
+        async with self._semaphore:
+            try:
+                async with self.session.request(method, self.url + path, json=json, timeout=request_timeout) as response:
+                    if response.status >= 400:
+                        raise LeetcodeRequestError(response.status, response.reason, self._parse_retry_after(response))
+                    body = await response.read()
+            except asyncio.TimeoutError:
+                raise LeetcodeRequestError(None, 'Request timed out')
+            except aiohttp.ClientError as e:
+                raise LeetcodeRequestError(None, str(e) or type(e).__name__)
+
+        start = time.perf_counter()
+        try:
+            result = jsonlib.loads(body)
+        except ValueError:
+            raise LeetcodeRequestError(None, 'Invalid JSON response')
+        self.record_payload(latency_key or path, len(body), time.perf_counter() - start)
+        return result
+
+    def record_payload(self, key: str, size: int, parse_time: float) -> None:
+        stats = self.payload_stats.setdefault(key, {'count': 0, 'bytes': 0, 'parse_time': 0.0})
+        stats['count'] += 1
+        stats['bytes'] += size
+        stats['parse_time'] += parse_time
+
+    def payload_summary(self) -> dict:
+        """Get the average response size and json parse time of each operation
+
+        Returns:
+            dict: operation mapped to its request count, average size in bytes and average parse time in seconds
+        """
+        return {
+            key: {
+                'count': stats['count'],
+                'average_bytes': stats['bytes'] / stats['count'],
+                'average_parse_time': stats['parse_time'] / stats['count']
+            }
+            for key, stats in self.payload_stats.items()
+        }
+
+    @staticmethod
+    def _parse_retry_after(response: aiohttp.ClientResponse) -> Optional[float]:
+        retry_after = response.headers.get('Retry-After')
+        if retry_after is None:
+            return None
+        try:
+            return max(0.0, float(retry_after))
+        except ValueError:
+            pass
+        try:
+            retry_at = parsedate_to_datetime(retry_after)
+        except (TypeError, ValueError):
+            return None
+        return max(0.0, (retry_at - datetime.now(retry_at.tzinfo)).total_seconds())
+
+    async def get(self, path: str, timeout: float = None, priority: RequestPriority = RequestPriority.USER) -> dict:
+        return await self.request('GET', path, timeout=timeout, priority=priority)
+
+    async def graphql(
+        self,
+        operation_name: str,
+        query: str,
+        variables: dict = None,
+        timeout: float = None,
+        priority: RequestPriority = RequestPriority.USER,
+        hedge: bool = False
+    ) -> dict:
+        """Send a graphql query to leetcode
+
+        Args:
+            operation_name (str): graphql operation name
+            query (str): graphql query
+            variables (dict, optional): query variables. Defaults to None.
+            timeout (float, optional): total timeout overriding the default one. Defaults to None.
+            priority (RequestPriority, optional): rate limiter priority class. Defaults to RequestPriority.USER.
+            hedge (bool, optional): send a second request if the first one is slower than usual, only for read queries. Defaults to False.
+
+        Returns:
+            dict: decoded json response including the 'data' and 'errors' keys
+        """
+        data = {
+            "operationName": operation_name,
+            "query": query,
+            "variables": variables or {}
+        }
+        return await self.request('POST', '/graphql', json=data, timeout=timeout, priority=priority, hedge=hedge, latency_key=operation_name)
+
+    async def query(self, graphql_query: GraphQLQuery, variables: dict = None, **kwargs) -> dict:
+        """Send a query of the query registry, see graphql for the keyword arguments"""
+        return await self.graphql(graphql_query.operation_name, graphql_query.query, variables, **kwargs)
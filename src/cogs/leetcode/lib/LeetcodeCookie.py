@@ -0,0 +1,116 @@
+#!/usr/bin/env python
+# -*-coding:utf-8 -*-
+'''
+@File      :    LeetcodeCookie.py
+@Time      :    2023/07/04
+@Author    :    Feiyu Zheng
+@Version   :    1.0
+@Contact   :    feiyuzheng98@gmail.com
+@License   :    Copyright (c) 2023-present Feiyu Zheng. All rights reserved.
+                This work is licensed under the terms of the MIT license.
+                For a copy, see <https://opensource.org/licenses/MIT>.
+@Desc      :    None
+'''
+
+import base64
+from datetime import datetime
+from enum import Enum
+import json
+from typing import Optional
+
+from cogs.leetcode.lib.LeetcodeClient import LeetcodeClient, LeetcodeRequestError
+from cogs.leetcode.lib.LeetcodeQueries import QUERIES
+from cogs.leetcode.lib.LeetcodeRateLimiter import RequestPriority
+
+def decode_session_expiration(token: str) -> Optional[datetime]:
+    """Read the expiration time out of a LEETCODE_SESSION jwt without verifying it
+
+    Args:
+        token (str): LEETCODE_SESSION cookie value
+
+    Returns:
+        Optional[datetime]: local expiration time, None if the token carries none
+    """
+    try:
+        payload = token.split('.')[1]
+        payload += '=' * (-len(payload) % 4)
+        claims = json.loads(base64.urlsafe_b64decode(payload))
+    except (AttributeError, IndexError, ValueError):
+        return None
+    for key in ('expired_time_', 'exp'):
+        if isinstance(claims, dict) and key in claims:
+            try:
+                return datetime.fromtimestamp(int(claims[key]))
+            except (TypeError, ValueError, OverflowError):
+                return None
+    return None
+
+class CookieStatus(str, Enum):
+    UNDEFINED = 'Undefined'
+    UNKNOWN = 'Unknown'
+    INVALID = 'Invalid'
+    EXPIRED = 'Expired'
+    VALID = 'Valid'
+
+class SessionCookieValidator:
+    __slots__ = ('client', 'cookie_name', 'status', 'expires', 'username', 'checked_at')
+
+    def __init__(self, client: LeetcodeClient, cookie_name: str = 'LEETCODE_SESSION'):
+        """Cached validation state of the leetcode session cookie
+
+        Args:
+            client (LeetcodeClient): client holding the cookie
+            cookie_name (str, optional): session cookie name. Defaults to 'LEETCODE_SESSION'.
+        """
+        self.client = client
+        self.cookie_name = cookie_name
+        self.status = CookieStatus.UNKNOWN
+        self.expires = None
+        self.username = None
+        self.checked_at = None
+        self.reset()
+
+    def reset(self) -> None:
+        """Forget the last validation, e.g. after the cookie changed"""
+        token = self.client.get_cookie(self.cookie_name)
+        self.status = CookieStatus.UNKNOWN if token else CookieStatus.UNDEFINED
+        self.expires = decode_session_expiration(token) if token else None
+        self.username = None
+        self.checked_at = None
+
+    @property
+    def expire_time(self) -> str:
+        return self.expires.strftime('%Y-%m-%d %H:%M:%S') if self.expires else 'Unknown'
+
+    async def validate(self) -> CookieStatus:
+        """Check with leetcode whether the cookie still signs the bot in
+
+        Raises:
+            LeetcodeRequestError: leetcode could not be reached or answered without a user status, the cached state is kept
+
+        Returns:
+            CookieStatus: new cookie status
+        """
+        if not self.client.has_cookie(self.cookie_name):
+            self.reset()
+            self.checked_at = datetime.now()
+            return self.status
+
+        response = await self.client.query(QUERIES['user_status'], priority=RequestPriority.BACKGROUND)
+        # graphql errors or a missing payload during an outage say nothing about the cookie, handled like a network error
+        if response.get('errors'):
+            raise LeetcodeRequestError(None, f"User status query failed: {response['errors'][0].get('message', 'unknown error')}")
+        user_status = (response.get('data') or {}).get('userStatus')
+        if not isinstance(user_status, dict) or 'isSignedIn' not in user_status:
+            raise LeetcodeRequestError(None, 'User status query returned no user status')
+
+        self.expires = self.client.get_cookie_expiration(self.cookie_name) or decode_session_expiration(self.client.get_cookie(self.cookie_name))
+        self.username = user_status.get('username') if user_status['isSignedIn'] else None
+        self.checked_at = datetime.now()
+        if self.expires is not None and self.expires <= datetime.now():
+            self.status = CookieStatus.EXPIRED
+        elif user_status['isSignedIn']:
+            self.status = CookieStatus.VALID
+        else:
+            self.status = CookieStatus.INVALID
+        return self.status
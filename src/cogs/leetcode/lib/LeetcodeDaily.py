@@ -0,0 +1,149 @@
+#!/usr/bin/env python
+# -*-coding:utf-8 -*-
+'''
+@File      :    LeetcodeDaily.py
+@Time      :    2023/07/02
+@Author    :    Feiyu Zheng
+@Version   :    1.0
+@Contact   :    feiyuzheng98@gmail.com
+@License   :    Copyright (c) 2023-present Feiyu Zheng. All rights reserved.
+                This work is licensed under the terms of the MIT license.
+                For a copy, see <https://opensource.org/licenses/MIT>.
+@Desc      :    None
+'''
+
+import asyncio
+from collections import OrderedDict
+from datetime import datetime
+import os
+from typing import Awaitable, Callable, Optional
+
+from pytz import utc
+
+from utils.io_utils import dump_data, dump_data_async, load_data
+
+class DailyChallengeStore:
+    __slots__ = ('fetch', 'file_path', 'max_days', '_challenges', '_in_flight')
+
+    def __init__(self, fetch: Callable[[], Awaitable[dict]], file_path: Optional[str] = None, max_days: int = 7):
+        """A store of daily coding challenges keyed by their leetcode date
+
+        Every caller asking for the same day shares a single fetch, so a day's challenge is requested once
+        no matter how many guilds start at the same time.
+
+        Args:
+            fetch (Callable[[], Awaitable[dict]]): coroutine function fetching the active daily challenge
+            file_path (Optional[str], optional): file persisting the stored challenges, None to keep them in memory only. Defaults to None.
+            max_days (int, optional): number of recent days to keep. Defaults to 7.
+        """
+        self.fetch = fetch
+        self.file_path = file_path
+        self.max_days = max_days
+        self._challenges = OrderedDict()
+        self._in_flight = None
+
+    @staticmethod
+    def today() -> str:
+        """Get the current leetcode date, daily challenges roll over at midnight UTC
+
+        Returns:
+            str: date in the format of YYYY-MM-DD
+        """
+        return datetime.now(utc).strftime('%Y-%m-%d')
+
+    def latest(self) -> Optional[dict]:
+        if not self._challenges:
+            return None
+        return next(reversed(self._challenges.values()))
+
+    def get_cached(self, date: str = None) -> Optional[dict]:
+        return self._challenges.get(date or self.today())
+
+    def put(self, challenge: dict) -> None:
+        self._challenges[challenge['date']] = challenge
+        # dates sort lexicographically, keep the newest ones at the end
+        for date in sorted(self._challenges):
+            self._challenges.move_to_end(date)
+        while len(self._challenges) > self.max_days:
+            self._challenges.popitem(last=False)
+
+    def load(self) -> None:
+        """Load the stored challenges from file if it exists"""
+        if self.file_path is None or not os.path.exists(self.file_path):
+            return
+        challenges = load_data(self.file_path)
+        if not challenges:
+            return
+        for challenge in challenges:
+            self.put(challenge)
+
+    def dump(self) -> None:
+        if self.file_path is None:
+            return
+        dump_data(data=list(self._challenges.values()), file_path=self.file_path)
+
+    async def dump_async(self) -> None:
+        """Write the stored challenges to file on the io thread pool"""
+        if self.file_path is None:
+            return
+        await dump_data_async(data=list(self._challenges.values()), file_path=self.file_path)
+
+    async def get(self, force: bool = False) -> dict:
+        """Get today's daily challenge, fetching it only if it is not stored yet
+
+        Args:
+            force (bool, optional): fetch even if today's challenge is stored. Defaults to False.
+
+        Returns:
+            dict: today's daily challenge, or the latest one if leetcode has not rolled over yet
+        """
+        if not force:
+            challenge = self.get_cached()
+            if challenge is not None:
+                return challenge
+        return await self.refresh()
+
+    async def get_or_stale(self) -> dict:
+        """Get today's daily challenge, serving the latest stored one while today's is fetched in the background
+
+        Returns:
+            dict: today's daily challenge if stored, otherwise the latest one, fetched only if nothing is stored
+        """
+        challenge = self.get_cached()
+        if challenge is not None:
+            return challenge
+        latest = self.latest()
+        if latest is None:
+            return await self.refresh()
+        self.revalidate()
+        return latest
+
+    def revalidate(self) -> None:
+        """Fetch the active daily challenge in the background unless a fetch is already in flight"""
+        if self._in_flight is not None:
+            return
+        self._in_flight = asyncio.ensure_future(self._fetch())
+        self._in_flight.add_done_callback(self._clear_in_flight)
+        # nobody awaits a background fetch, retrieve its exception so that it is not reported as unhandled
+        self._in_flight.add_done_callback(lambda future: future.cancelled() or future.exception())
+
+    async def refresh(self) -> dict:
+        """Fetch the active daily challenge, joining the fetch already in flight if any
+
+        Returns:
+            dict: active daily challenge
+        """
+        if self._in_flight is None:
+            self._in_flight = asyncio.ensure_future(self._fetch())
+            self._in_flight.add_done_callback(self._clear_in_flight)
+        return await asyncio.shield(self._in_flight)
+
+    def _clear_in_flight(self, future: asyncio.Future) -> None:
+        if self._in_flight is future:
+            self._in_flight = None
+
+    async def _fetch(self) -> dict:
+        challenge = await self.fetch()
+        self.put(challenge)
+        await self.dump_async()
+        return challenge
@@ -0,0 +1,299 @@
+#!/usr/bin/env python
+# -*-coding:utf-8 -*-
+'''
+@File      :    LeetcodeDatabase.py
+@Time      :    2023/07/06
+@Author    :    Feiyu Zheng
+@Version   :    1.0
+@Contact   :    feiyuzheng98@gmail.com
+@License   :    Copyright (c) 2023-present Feiyu Zheng. All rights reserved.
+                This work is licensed under the terms of the MIT license.
+                For a copy, see <https://opensource.org/licenses/MIT>.
+@Desc      :    None
+'''
+
+from contextlib import contextmanager
+from enum import Enum
+import json
+import sqlite3
+import sys
+from typing import List, Type, Union
+
+from cogs.leetcode.lib.LeetcodeTime import parse_time, unpack_time
+from lib.IODict import MISSING, apply_undo
+
+class StorageBackend(str, Enum):
+    JSON = 'json'
+    SQLITE = 'sqlite'
+
+class LeetcodeDatabase:
+    __slots__ = ('file_path', 'connection', 'transaction_depth')
+
+    SCHEMA = (
+        'CREATE TABLE IF NOT EXISTS guild_config (guild_id INTEGER NOT NULL, key TEXT NOT NULL, value TEXT NOT NULL, PRIMARY KEY (guild_id, key))',
+        'CREATE TABLE IF NOT EXISTS daily_report (guild_id INTEGER NOT NULL, user_id INTEGER NOT NULL, value INTEGER NOT NULL, PRIMARY KEY (guild_id, user_id))',
+        'CREATE TABLE IF NOT EXISTS history_score (guild_id INTEGER NOT NULL, user_id INTEGER NOT NULL, value INTEGER NOT NULL, PRIMARY KEY (guild_id, user_id))',
+        # cross guild lookups of a user
+        'CREATE INDEX IF NOT EXISTS daily_report_user_id ON daily_report (user_id)',
+        'CREATE INDEX IF NOT EXISTS history_score_user_id ON history_score (user_id)'
+    )
+
+    def __init__(self, file_path: str):
+        """One SQLite database holding the config, daily report and history score of every guild
+
+        Args:
+            file_path (str): database file path
+        """
+        self.file_path = file_path
+        # autocommit, every statement is its own transaction unless one is opened explicitly
+        self.connection = sqlite3.connect(file_path, isolation_level=None)
+        self.transaction_depth = 0
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        self.connection.execute('PRAGMA synchronous=NORMAL')
+        for statement in self.SCHEMA:
+            self.connection.execute(statement)
+
+    @contextmanager
+    def transaction(self):
+        """Commit every statement of the block at once, or none of them if it raises
+
+        Nested transactions join the outermost one.
+        """
+        if self.transaction_depth > 0:
+            self.transaction_depth += 1
+            try:
+                yield self
+            finally:
+                self.transaction_depth -= 1
+            return
+
+        self.transaction_depth = 1
+        try:
+            with self.connection:
+                self.connection.execute('BEGIN')
+                yield self
+        finally:
+            self.transaction_depth = 0
+
+    def guild_ids(self) -> List[int]:
+        return [row[0] for row in self.connection.execute('SELECT DISTINCT guild_id FROM guild_config')]
+
+    def has_guild(self, guild_id: int) -> bool:
+        return self.connection.execute('SELECT 1 FROM guild_config WHERE guild_id = ? LIMIT 1', (guild_id,)).fetchone() is not None
+
+    def delete_guild(self, guild_id: int) -> None:
+        with self.connection:
+            self.connection.execute('BEGIN')
+            for table in ('guild_config', 'daily_report', 'history_score'):
+                self.connection.execute(f'DELETE FROM {table} WHERE guild_id = ?', (guild_id,))
+
+    def import_guild(self, guild_id: int, config: dict, daily_report: dict, history_score: dict) -> None:
+        """Replace the stored data of a guild in a single transaction
+
+        Args:
+            guild_id (int): guild id
+            config (dict): guild config
+            daily_report (dict): user id mapped to the daily report value
+            history_score (dict): user id mapped to the history score
+        """
+        with self.connection:
+            self.connection.execute('BEGIN')
+            for table in ('guild_config', 'daily_report', 'history_score'):
+                self.connection.execute(f'DELETE FROM {table} WHERE guild_id = ?', (guild_id,))
+            self.connection.executemany(
+                'INSERT INTO guild_config (guild_id, key, value) VALUES (?, ?, ?)',
+                ((guild_id, k, json.dumps(v)) for k, v in config.items())
+            )
+            self.connection.executemany(
+                'INSERT INTO daily_report (guild_id, user_id, value) VALUES (?, ?, ?)',
+                ((guild_id, int(k), v) for k, v in daily_report.items())
+            )
+            self.connection.executemany(
+                'INSERT INTO history_score (guild_id, user_id, value) VALUES (?, ?, ?)',
+                ((guild_id, int(k), v) for k, v in history_score.items())
+            )
+
+    def close(self) -> None:
+        self.connection.close()
+
+class SQLiteGuildDict(dict):
+    __slots__ = ('database', 'guild_id', '_transaction_undo')
+
+    TABLE = None
+    KEY_COLUMN = None
+
+    def __init__(self, database: LeetcodeDatabase, guild_id: int):
+        """A dict mirroring the rows of one guild in a database table, writing every mutation through as one row
+
+        Args:
+            database (LeetcodeDatabase): database
+            guild_id (int): guild id
+        """
+        super().__init__()
+        self.database = database
+        self.guild_id = guild_id
+        self._transaction_undo = None
+
+    @property
+    def file_path(self) -> str:
+        return self.database.file_path
+
+    def encode(self, key, value):
+        return value
+
+    def decode(self, key, value):
+        return value
+
+    def load(self) -> None:
+        rows = self.database.connection.execute(f'SELECT {self.KEY_COLUMN}, value FROM {self.TABLE} WHERE guild_id = ?', (self.guild_id,))
+        for key, value in rows:
+            dict.__setitem__(self, key, self.decode(key, value))
+
+    def _record_undo(self, key) -> None:
+        if self._transaction_undo is not None and key not in self._transaction_undo:
+            self._transaction_undo[key] = dict.get(self, key, MISSING)
+
+    def __setitem__(self, key, value) -> None:
+        self._record_undo(key)
+        super().__setitem__(key, value)
+        self.database.connection.execute(
+            f'INSERT INTO {self.TABLE} (guild_id, {self.KEY_COLUMN}, value) VALUES (?, ?, ?) '
+            f'ON CONFLICT (guild_id, {self.KEY_COLUMN}) DO UPDATE SET value = excluded.value',
+            (self.guild_id, key, self.encode(key, value))
+        )
+
+    def __delitem__(self, key) -> None:
+        self._record_undo(key)
+        super().__delitem__(key)
+        self.database.connection.execute(f'DELETE FROM {self.TABLE} WHERE guild_id = ? AND {self.KEY_COLUMN} = ?', (self.guild_id, key))
+
+    @contextmanager
+    def transaction(self):
+        """Commit the mutations of the block in one database transaction, see IODict.transaction"""
+        if self._transaction_undo is not None:
+            # joins the outermost transaction, which rolls back the dict
+            with self.database.transaction():
+                yield self
+            return
+
+        self._transaction_undo = {}
+        try:
+            with self.database.transaction():
+                yield self
+        except BaseException:
+            apply_undo(self, self._transaction_undo)
+            raise
+        finally:
+            self._transaction_undo = None
+
+    def flush(self) -> None:
+        # every mutation is committed on its own
+        pass
+
+    @classmethod
+    def from_database(cls: Type['SQLiteGuildDict'], database: LeetcodeDatabase, guild_id: int) -> 'SQLiteGuildDict':
+        d = cls(database, guild_id)
+        d.load()
+        return d
+
+class SQLiteGuildConfigDict(SQLiteGuildDict):
+    __slots__ = ()
+
+    TABLE = 'guild_config'
+    KEY_COLUMN = 'key'
+    TIME_KEYS = ('start_time', 'end_time', 'remind_time')
+    INTERNED_KEYS = ('timezone', 'daily_report_file_name', 'history_score_file_name')
+
+    def __init__(
+        self,
+        database: LeetcodeDatabase,
+        guild_id: int,
+        leetcode_role_id: int = None,
+        leetcode_channel_id: int = None,
+        daily_challenge_status: bool = False,
+        timezone: str = 'UTC',
+        start_time: Union[int, dict] = 0,
+        end_time: Union[int, dict] = 23 * 3600 + 59 * 60 + 59,
+        remind_time: Union[int, dict] = 23 * 3600,
+        daily_report_file_name: str = "daily report.json",
+        history_score_file_name: str = "history score.json"
+    ):
+        """A SQLiteGuildDict for guild config, see GuildConfigDict
+
+        Like GuildConfigDict, times are held as seconds of the day but stored in the
+        {'hour': "HH", 'minute': "MM", 'second': "SS"} layout.
+
+        Args:
+            database (LeetcodeDatabase): database
+            guild_id (int): guild id
+            leetcode_role_id (int, optional): leetcode role id, None when loading from the database. Defaults to None.
+            leetcode_channel_id (int, optional): leetcode channel id, None when loading from the database. Defaults to None.
+            daily_challenge_status (bool, optional): daily challenge status. Defaults to False.
+            timezone (str, optional): timezone used for daily challenge. Defaults to 'UTC'.
+            start_time (Union[int, dict], optional): daily challenge start time. Defaults to 00:00:00.
+            end_time (Union[int, dict], optional): daily challenge end time. Defaults to 23:59:59.
+            remind_time (Union[int, dict], optional): daily challenge remind time. Defaults to 23:00:00.
+            daily_report_file_name (str, optional): daily report file name of the json backend. Defaults to "daily report.json".
+            history_score_file_name (str, optional): history score file name of the json backend. Defaults to "history score.json".
+        """
+        super().__init__(database, guild_id)
+        if leetcode_role_id is None:
+            return
+        config = {
+            'leetcode_role_id': int(leetcode_role_id),
+            'leetcode_channel_id': int(leetcode_channel_id),
+            'daily_challenge_status': daily_challenge_status,
+            'timezone': sys.intern(timezone),
+            'start_time': parse_time(start_time),
+            'end_time': parse_time(end_time),
+            'remind_time': parse_time(remind_time),
+            'daily_report_file_name': sys.intern(daily_report_file_name),
+            'history_score_file_name': sys.intern(history_score_file_name)
+        }
+        dict.update(self, config)
+        with database.connection:
+            database.connection.execute('BEGIN')
+            database.connection.execute('DELETE FROM guild_config WHERE guild_id = ?', (guild_id,))
+            database.connection.executemany(
+                'INSERT INTO guild_config (guild_id, key, value) VALUES (?, ?, ?)',
+                ((guild_id, k, self.encode(k, v)) for k, v in config.items())
+            )
+
+    def encode(self, key, value) -> str:
+        if key in self.TIME_KEYS:
+            value = unpack_time(value)
+        return json.dumps(value)
+
+    def decode(self, key, value: str):
+        value = json.loads(value)
+        if key in self.TIME_KEYS:
+            return parse_time(value)
+        if key in self.INTERNED_KEYS:
+            return sys.intern(value)
+        return value
+
+    def to_serializable(self) -> dict:
+        data = dict(self)
+        for key in self.TIME_KEYS:
+            data[key] = unpack_time(data[key])
+        return data
+
+    def __setitem__(self, key, value) -> None:
+        assert key in self, f"KeyError: Invalid key f{key}"
+        if key in self.TIME_KEYS:
+            value = parse_time(value)
+        elif key in self.INTERNED_KEYS:
+            value = sys.intern(value)
+        super().__setitem__(key, value)
+
+class SQLiteGuildDailyReportDict(SQLiteGuildDict):
+    __slots__ = ()
+
+    TABLE = 'daily_report'
+    KEY_COLUMN = 'user_id'
+
+class SQLiteGuildHistoryScoreDict(SQLiteGuildDict):
+    __slots__ = ()
+
+    TABLE = 'history_score'
+    KEY_COLUMN = 'user_id'
@@ -12,11 +12,15 @@
 @Desc      :    None
 '''
 
+from contextlib import contextmanager, ExitStack
 import os
-from typing import Union, Type
+import sys
+from typing import List, Optional, Union, Type
 
-from lib.IODict import IODict
-from utils.io_utils import load_data
+from cogs.leetcode.lib.LeetcodeDatabase import LeetcodeDatabase, SQLiteGuildConfigDict, SQLiteGuildDailyReportDict, SQLiteGuildHistoryScoreDict
+from cogs.leetcode.lib.LeetcodeTime import parse_time, unpack_time
+from lib.IODict import IODict, SerializationType, WriteBehindPolicy
+from utils.io_utils import dump_data, forget, load_data
 
 class LeetcodeGuild:
     __slots__ = ('_config', '_daily_report', '_history_score')
@@ -27,7 +31,10 @@ class LeetcodeGuild:
         leetcode_role_id: int,
         leetcode_channel_id: int,
         config_file_name: str = 'config.json',
-        sync: bool = True
+        sync: bool = True,
+        write_behind: Optional[WriteBehindPolicy] = None,
+        journal_max_size: Optional[int] = None,
+        serialization_type: SerializationType = SerializationType.JSON
     ):
         """_summary_
 
@@ -35,22 +42,35 @@ class LeetcodeGuild:
             config (GuildConfigDict): _description_
             daily_report (GuildDailyReportDict): _description_
             history_score (GuildHistoryScoreDict): _description_
+            serialization_type (SerializationType, optional): serialization type of the daily report and history score. Defaults to SerializationType.JSON.
         """
 
         config_file_path = os.path.join(guild_module_data_dir_path, config_file_name)
-        self.config = GuildConfigDict(config_file_path, leetcode_role_id, leetcode_channel_id, daily_challenge_status=True, sync=sync)
+        self.config = GuildConfigDict(
+            config_file_path,
+            leetcode_role_id,
+            leetcode_channel_id,
+            daily_challenge_status=True,
+            daily_report_file_name='daily report' + serialization_type.extension,
+            history_score_file_name='history score' + serialization_type.extension,
+            sync=sync,
+            write_behind=write_behind
+        )
 
         daily_report_file_path = os.path.join(guild_module_data_dir_path, self.config['daily_report_file_name'])
-        self.daily_report = GuildDailyReportDict(daily_report_file_path, sync=sync)
+        self.daily_report = GuildDailyReportDict(daily_report_file_path, sync=sync, write_behind=write_behind, journal_max_size=journal_max_size)
 
         history_score_file_path = os.path.join(guild_module_data_dir_path, self.config['history_score_file_name'])
-        self.history_score = GuildHistoryScoreDict(history_score_file_path, sync=sync)
+        self.history_score = GuildHistoryScoreDict(history_score_file_path, sync=sync, write_behind=write_behind, journal_max_size=journal_max_size)
     
     @classmethod
     def from_file(
         cls: Type['LeetcodeGuild'],
         guild_module_data_dir_path: str,
-        config_file_name: str = 'config.json'
+        config_file_name: str = 'config.json',
+        write_behind: Optional[WriteBehindPolicy] = None,
+        journal_max_size: Optional[int] = None,
+        serialization_type: Optional[SerializationType] = None
     ) -> 'LeetcodeGuild':
         """_summary_
 
@@ -58,27 +78,107 @@ class LeetcodeGuild:
             cls (Type[&#39;LeetcodeGuild&#39;]): _description_
             guild_module_data_dir_path (str): _description_
             config_file_name (str, optional): _description_. Defaults to 'config.json'.
+            write_behind (Optional[WriteBehindPolicy], optional): write-behind policy of the guild files. Defaults to None.
+            journal_max_size (Optional[int], optional): journal compaction threshold of the daily report and history score, no journal if None. Defaults to None.
+            serialization_type (Optional[SerializationType], optional): serialization type to convert the daily report and history score to, kept as stored if None. Defaults to None.
 
         Returns:
             LeetcodeGuild: _description_
         """
         
         config_file_path = os.path.join(guild_module_data_dir_path, config_file_name)
-        config = GuildConfigDict.from_file(config_file_path)
+        config = GuildConfigDict.from_file(config_file_path, write_behind)
+
+        if serialization_type is not None:
+            for key, dict_cls in (('daily_report_file_name', GuildDailyReportDict), ('history_score_file_name', GuildHistoryScoreDict)):
+                file_name, ext = os.path.splitext(config[key])
+                if ext == serialization_type.extension:
+                    continue
+                convert_guild_file(
+                    dict_cls,
+                    os.path.join(guild_module_data_dir_path, config[key]),
+                    os.path.join(guild_module_data_dir_path, file_name + serialization_type.extension)
+                )
+                config[key] = file_name + serialization_type.extension
         
         daily_report_file_path = os.path.join(guild_module_data_dir_path, config['daily_report_file_name'])
-        daily_report = GuildDailyReportDict.from_file(daily_report_file_path)
+        daily_report = GuildDailyReportDict.from_file(daily_report_file_path, write_behind, journal_max_size)
 
         history_score_file_path = os.path.join(guild_module_data_dir_path, config['history_score_file_name'])
-        history_score = GuildHistoryScoreDict.from_file(history_score_file_path)
+        history_score = GuildHistoryScoreDict.from_file(history_score_file_path, write_behind, journal_max_size)
 
-        leetcodeGuild = cls(guild_module_data_dir_path, config['leetcode_role_id'], config['leetcode_channel_id'], config_file_name, sync=False)
+        leetcodeGuild = cls(guild_module_data_dir_path, config['leetcode_role_id'], config['leetcode_channel_id'], config_file_name, sync=False, write_behind=write_behind, journal_max_size=journal_max_size)
         leetcodeGuild.config = config
         leetcodeGuild.daily_report = daily_report
         leetcodeGuild.history_score = history_score
         
         return leetcodeGuild
-        
+
+    @classmethod
+    def create_in_database(
+        cls: Type['LeetcodeGuild'],
+        database: LeetcodeDatabase,
+        guild_id: int,
+        leetcode_role_id: int,
+        leetcode_channel_id: int
+    ) -> 'LeetcodeGuild':
+        """Create a guild in the sqlite backend, replacing any stored data of it
+
+        Args:
+            database (LeetcodeDatabase): database
+            guild_id (int): guild id
+            leetcode_role_id (int): leetcode role id
+            leetcode_channel_id (int): leetcode channel id
+
+        Returns:
+            LeetcodeGuild: LeetcodeGuild instance
+        """
+        database.delete_guild(guild_id)
+        leetcodeGuild = cls.__new__(cls)
+        leetcodeGuild.config = SQLiteGuildConfigDict(database, guild_id, leetcode_role_id, leetcode_channel_id, daily_challenge_status=True)
+        leetcodeGuild.daily_report = SQLiteGuildDailyReportDict(database, guild_id)
+        leetcodeGuild.history_score = SQLiteGuildHistoryScoreDict(database, guild_id)
+        return leetcodeGuild
+
+    @classmethod
+    def from_database(
+        cls: Type['LeetcodeGuild'],
+        database: LeetcodeDatabase,
+        guild_id: int
+    ) -> 'LeetcodeGuild':
+        """Load a guild from the sqlite backend
+
+        Args:
+            database (LeetcodeDatabase): database
+            guild_id (int): guild id
+
+        Returns:
+            LeetcodeGuild: LeetcodeGuild instance
+        """
+        leetcodeGuild = cls.__new__(cls)
+        leetcodeGuild.config = SQLiteGuildConfigDict.from_database(database, guild_id)
+        leetcodeGuild.daily_report = SQLiteGuildDailyReportDict.from_database(database, guild_id)
+        leetcodeGuild.history_score = SQLiteGuildHistoryScoreDict.from_database(database, guild_id)
+        return leetcodeGuild
+
+    @contextmanager
+    def transaction(self):
+        """Batch the mutations of the config, daily report and history score
+
+        Each store is written once when the block ends. If the block raises, all three
+        stores are restored and nothing is written.
+        """
+        with ExitStack() as stack:
+            stack.enter_context(self.config.transaction())
+            stack.enter_context(self.daily_report.transaction())
+            stack.enter_context(self.history_score.transaction())
+            yield self
+
+    def flush(self) -> None:
+        """Write the pending mutations of all guild files"""
+        self.config.flush()
+        self.daily_report.flush()
+        self.history_score.flush()
     
     @property
     def config(self):
@@ -106,6 +206,12 @@ class LeetcodeGuild:
 
 
 class GuildConfigDict(IODict):
+    __slots__ = ()
+
+    TIME_KEYS = ('start_time', 'end_time', 'remind_time')
+    # shared by most guilds, one copy of each is kept in memory
+    INTERNED_KEYS = ('timezone', 'daily_report_file_name', 'history_score_file_name')
+
     def __init__(
         self,
         file_path: str,
@@ -113,54 +219,67 @@ class GuildConfigDict(IODict):
         leetcode_channel_id: int,
         daily_challenge_status: bool = False,
         timezone: str = 'UTC',
-        start_time: dict = {'hour': "00", 'minute': "00", 'second': "00"},
-        end_time: dict = {'hour': "23", 'minute': "59", 'second': "59"},
-        remind_time: dict = {'hour': "23", 'minute': "00", 'second': "00"},
+        start_time: Union[int, dict] = 0,
+        end_time: Union[int, dict] = 23 * 3600 + 59 * 60 + 59,
+        remind_time: Union[int, dict] = 23 * 3600,
         daily_report_file_name: str = "daily report.json",
         history_score_file_name: str = "history score.json",
-        sync: bool = True
+        sync: bool = True,
+        write_behind: Optional[WriteBehindPolicy] = None
     ):
         """An IODict subclass for guild config
 
+        Times are held as seconds of the day and the timezone and file names are interned. The
+        file keeps the {'hour': "HH", 'minute': "MM", 'second': "SS"} layout of the times.
+
         Args:
             file_path (str): config file path
             leetcode_role_id (int): leetcode role id
             leetcode_channel_id (int): leetcode channel id
             daily_challenge_status (bool, optional): daily challenge status. Defaults to False.
             timezone (str, optional): timezone used for daily challenge. Defaults to 'UTC'.
-            start_time (dict, optional): daily challenge start time. Defaults to {'hour': "00", 'minute': "00", 'second': "00"}.
-            end_time (dict, optional): daily challenge end time. Defaults to {'hour': "23", 'minute': "59", 'second': "59"}.
-            remind_time (dict, optional): daily challenge remind time. Defaults to {'hour': "23", 'minute': "00", 'second': "00"}.
+            start_time (Union[int, dict], optional): daily challenge start time. Defaults to 00:00:00.
+            end_time (Union[int, dict], optional): daily challenge end time. Defaults to 23:59:59.
+            remind_time (Union[int, dict], optional): daily challenge remind time. Defaults to 23:00:00.
             daily_report_file_name (str, optional): daily report file name. Defaults to "daily report".
             history_score_file_name (str, optional): history score file name. Defaults to "history score".
             sync (bool, optional): whether sync to the file. Defaults to True.
+            write_behind (Optional[WriteBehindPolicy], optional): write-behind policy, writes through if None. Defaults to None.
         """
         dict.__setitem__(self, 'leetcode_role_id', int(leetcode_role_id))
         dict.__setitem__(self, 'leetcode_channel_id', int(leetcode_channel_id))
         dict.__setitem__(self, 'daily_challenge_status', daily_challenge_status)
-        dict.__setitem__(self, 'timezone', timezone)
-        dict.__setitem__(self, 'start_time', start_time)
-        dict.__setitem__(self, 'end_time', end_time)
-        dict.__setitem__(self, 'remind_time', remind_time)
-        dict.__setitem__(self, 'daily_report_file_name', daily_report_file_name)
-        dict.__setitem__(self, 'history_score_file_name', history_score_file_name)
-        super().__init__(file_path, sync)
+        dict.__setitem__(self, 'timezone', sys.intern(timezone))
+        dict.__setitem__(self, 'start_time', parse_time(start_time))
+        dict.__setitem__(self, 'end_time', parse_time(end_time))
+        dict.__setitem__(self, 'remind_time', parse_time(remind_time))
+        dict.__setitem__(self, 'daily_report_file_name', sys.intern(daily_report_file_name))
+        dict.__setitem__(self, 'history_score_file_name', sys.intern(history_score_file_name))
+        super().__init__(file_path, sync, write_behind)
+
+    def to_serializable(self) -> dict:
+        data = dict(self)
+        for key in self.TIME_KEYS:
+            data[key] = unpack_time(data[key])
+        return data
     
     @classmethod
     def from_file(
         cls: Type['GuildConfigDict'],
-        file_path: str
+        file_path: str,
+        write_behind: Optional[WriteBehindPolicy] = None
     ) -> 'GuildConfigDict':
         """static method to create a GuildConfigDict instance from file
 
         Args:
             cls (Type['GuildConfigDict']): GuildConfigDict constructor
             file_path (str): config file path
+            write_behind (Optional[WriteBehindPolicy], optional): write-behind policy, writes through if None. Defaults to None.
 
         Returns:
             GuildConfigDict: GuildConfigDict instance
         """
-        return cls(file_path, **load_data(file_path), sync=False)
+        return cls(file_path, **load_data(file_path), sync=False, write_behind=write_behind)
     
     @property
     def leetcode_role_id(self) -> int:
@@ -189,96 +308,237 @@ class GuildConfigDict(IODict):
         self['timezone'] = val
     
     @property
-    def start_time(self) -> dict:
+    def start_time(self) -> int:
         return self['start_time']
     
     @start_time.setter
-    def start_time(self, val: dict):
+    def start_time(self, val: Union[int, dict]):
         self['start_time'] = val
     
     @property
-    def end_time(self) -> dict:
+    def end_time(self) -> int:
         return self['end_time']
     
     @end_time.setter
-    def end_time(self, val: dict):
+    def end_time(self, val: Union[int, dict]):
         self['end_time'] = val
     
     @property
-    def remind_time(self) -> dict:
+    def remind_time(self) -> int:
         return self['remind_time']
     
     @remind_time.setter
-    def remind_time(self, val: dict):
+    def remind_time(self, val: Union[int, dict]):
         self['remind_time'] = val
     
     
     def __setitem__(self, key, value) -> None:
         assert key in self, f"KeyError: Invalid key f{key}"
+        if key in self.TIME_KEYS:
+            value = parse_time(value)
+        elif key in self.INTERNED_KEYS:
+            value = sys.intern(value)
         super().__setitem__(key, value)
 
 class GuildDailyReportDict(IODict):
+    __slots__ = ()
+
     def __init__(
         self,
         file_path: str,
-        sync: bool = True
+        sync: bool = True,
+        write_behind: Optional[WriteBehindPolicy] = None,
+        journal_max_size: Optional[int] = None
     ):
         """An IODict subclass for guild daily report
 
         Args:
             file_path (str): daily report file path
             sync (bool, optional): whether sync to the file. Defaults to True.
+            write_behind (Optional[WriteBehindPolicy], optional): write-behind policy, writes through if None. Defaults to None.
+            journal_max_size (Optional[int], optional): journal size in bytes triggering a compaction, no journal if None. Defaults to None.
         """
-        super().__init__(file_path, sync)
+        super().__init__(file_path, sync, write_behind, journal_max_size)
     
     @classmethod
     def from_file(
         cls: Type['GuildDailyReportDict'],
-        file_path: str
+        file_path: str,
+        write_behind: Optional[WriteBehindPolicy] = None,
+        journal_max_size: Optional[int] = None
     ) -> 'GuildDailyReportDict':
         """static method to create a GuildDailyReportDict instance from file
 
         Args:
             cls (Type['GuildDailyReportDict']): GuildDailyReportDict constructor
             file_path (str): daily report file path
+            write_behind (Optional[WriteBehindPolicy], optional): write-behind policy, writes through if None. Defaults to None.
+            journal_max_size (Optional[int], optional): journal size in bytes triggering a compaction, no journal if None. Defaults to None.
 
         Returns:
             GuildDailyReportDict: GuildDailyReportDict instance
         """
-        d = cls(file_path, sync=False)
+        d = cls(file_path, sync=False, write_behind=write_behind, journal_max_size=journal_max_size)
         for k, v in load_data(file_path).items():
             dict.__setitem__(d, int(k), v)
+        d.replay_journal()
         return d
 
 class GuildHistoryScoreDict(IODict):
+    __slots__ = ()
+
     def __init__(
         self,
         file_path: str,
-        sync: bool = True
+        sync: bool = True,
+        write_behind: Optional[WriteBehindPolicy] = None,
+        journal_max_size: Optional[int] = None
     ):
         """An IODict subclass for guild history score
 
         Args:
             file_path (str): history score file path
             sync (bool, optional): whether sync to the file. Defaults to True.
+            write_behind (Optional[WriteBehindPolicy], optional): write-behind policy, writes through if None. Defaults to None.
+            journal_max_size (Optional[int], optional): journal size in bytes triggering a compaction, no journal if None. Defaults to None.
         """
-        super().__init__(file_path, sync)
+        super().__init__(file_path, sync, write_behind, journal_max_size)
     
     @classmethod
     def from_file(
         cls: Type['GuildHistoryScoreDict'],
-        file_path: str
+        file_path: str,
+        write_behind: Optional[WriteBehindPolicy] = None,
+        journal_max_size: Optional[int] = None
     ) -> 'GuildHistoryScoreDict':
         """static method to create a GuildHistoryScoreDict instance from file
 
         Args:
             cls (Type['GuildHistoryScoreDict']): GuildHistoryScoreDict constructor
             file_path (str): history score file path
+            write_behind (Optional[WriteBehindPolicy], optional): write-behind policy, writes through if None. Defaults to None.
+            journal_max_size (Optional[int], optional): journal size in bytes triggering a compaction, no journal if None. Defaults to None.
 
         Returns:
             GuildHistoryScoreDict: GuildHistoryScoreDict instance
         """
-        d = cls(file_path, sync=False)
+        d = cls(file_path, sync=False, write_behind=write_behind, journal_max_size=journal_max_size)
+        for k, v in load_data(file_path).items():
+            dict.__setitem__(d, int(k), v)
+        d.replay_journal()
+        return d
+
+class GuildManifestDict(IODict):
+    __slots__ = ()
+
+    SCHEDULE_KEYS = ('timezone', 'start_time', 'remind_time', 'end_time')
+
+    def __init__(
+        self,
+        file_path: str,
+        sync: bool = True,
+        write_behind: Optional[WriteBehindPolicy] = None
+    ):
+        """An IODict subclass indexing the initialized guilds of every storage backend
+
+        Every guild id maps to its storage backend, its storage location and its schedule, so
+        that the guilds can be resumed and scheduled without scanning the data directory or
+        reading any guild file.
+
+        Args:
+            file_path (str): manifest file path
+            sync (bool, optional): whether sync to the file. Defaults to True.
+            write_behind (Optional[WriteBehindPolicy], optional): write-behind policy, writes through if None. Defaults to None.
+        """
+        super().__init__(file_path, sync, write_behind)
+
+    @classmethod
+    def from_file(
+        cls: Type['GuildManifestDict'],
+        file_path: str,
+        write_behind: Optional[WriteBehindPolicy] = None
+    ) -> 'GuildManifestDict':
+        """static method to create a GuildManifestDict instance from file
+
+        Args:
+            cls (Type['GuildManifestDict']): GuildManifestDict constructor
+            file_path (str): manifest file path
+            write_behind (Optional[WriteBehindPolicy], optional): write-behind policy, writes through if None. Defaults to None.
+
+        Returns:
+            GuildManifestDict: GuildManifestDict instance
+        """
+        d = cls(file_path, sync=False, write_behind=write_behind)
         for k, v in load_data(file_path).items():
             dict.__setitem__(d, int(k), v)
         return d
+
+    def record(self, guild_id: int, storage_backend: str, location: str, config: dict) -> None:
+        """Add or update the entry of a guild
+
+        Args:
+            guild_id (int): guild id
+            storage_backend (str): storage backend of the guild
+            location (str): guild module data directory relative to the data directory, or the database file name
+            config (dict): guild config, the schedule is only kept if the daily challenge is enabled
+        """
+        entry = {
+            'storage_backend': storage_backend,
+            'location': location,
+            'schedule': {key: config[key] for key in self.SCHEDULE_KEYS} if config['daily_challenge_status'] else None
+        }
+        if self.get(guild_id) != entry:
+            self[guild_id] = entry
+
+def convert_guild_file(dict_cls: Type[IODict], file_path: str, new_file_path: str) -> None:
+    """Rewrite a guild file, and its journal if any, with the serialization type of another extension
+
+    Args:
+        dict_cls (Type[IODict]): GuildDailyReportDict or GuildHistoryScoreDict
+        file_path (str): current file path
+        new_file_path (str): file path with the new extension
+    """
+    # replays the journal so that no journaled mutation is lost
+    d = dict_cls.from_file(file_path)
+    if not dump_data(data=d, file_path=new_file_path):
+        raise OSError(f'Failed to convert {file_path} to {new_file_path}')
+    for path in (file_path, d.journal_path, d.compacting_journal_path):
+        if os.path.exists(path):
+            os.remove(path)
+    forget(file_path)
+
+def migrate_json_guilds(
+    database: LeetcodeDatabase,
+    data_dir_path: str,
+    module_data_dir_name: str = 'leetcode',
+    config_file_name: str = 'config.json',
+    overwrite: bool = False
+) -> List[int]:
+    """Import the guild directories of the json backend into the database
+
+    The json files are left in place so that the json backend can still be selected.
+
+    Args:
+        database (LeetcodeDatabase): target database
+        data_dir_path (str): bot data directory holding one directory per guild
+        module_data_dir_name (str, optional): module data directory name. Defaults to 'leetcode'.
+        config_file_name (str, optional): guild config file name. Defaults to 'config.json'.
+        overwrite (bool, optional): whether to replace guilds already in the database. Defaults to False.
+
+    Returns:
+        List[int]: ids of the imported guilds
+    """
+    imported = []
+    for guild in os.listdir(data_dir_path):
+        if not guild.isdigit():
+            continue
+        guild_id = int(guild)
+        guild_module_data_dir_path = os.path.join(data_dir_path, guild, module_data_dir_name)
+        if not os.path.exists(guild_module_data_dir_path):
+            continue
+        if not overwrite and database.has_guild(guild_id):
+            continue
+        leetcode_guild = LeetcodeGuild.from_file(guild_module_data_dir_path, config_file_name)
+        database.import_guild(guild_id, leetcode_guild.config.to_serializable(), leetcode_guild.daily_report, leetcode_guild.history_score)
+        imported.append(guild_id)
+    return imported
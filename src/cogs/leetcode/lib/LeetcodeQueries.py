@@ -0,0 +1,115 @@
+#!/usr/bin/env python
+# -*-coding:utf-8 -*-
+'''
+@File      :    LeetcodeQueries.py
+@Time      :    2023/07/04
+@Author    :    Feiyu Zheng
+@Version   :    1.0
+@Contact   :    feiyuzheng98@gmail.com
+@License   :    Copyright (c) 2023-present Feiyu Zheng. All rights reserved.
+                This work is licensed under the terms of the MIT license.
+                For a copy, see <https://opensource.org/licenses/MIT>.
+@Desc      :    None
+'''
+
+def render_selection(fields: tuple) -> str:
+    """Render a selection set from a field declaration
+
+    Args:
+        fields (tuple): field names, aliases like 'paidOnly: isPaidOnly' or dicts mapping an object field to its own fields
+
+    Returns:
+        str: selection set, empty for scalar roots
+    """
+    if not fields:
+        return ''
+    selections = []
+    for field in fields:
+        if isinstance(field, dict):
+            selections.extend(f'{name} {render_selection(subfields)}' for name, subfields in field.items())
+        else:
+            selections.append(field)
+    return '{' + ' '.join(selections) + '}'
+
+class GraphQLQuery:
+    __slots__ = ('operation_name', 'root', 'fields', 'variables', 'query')
+
+    def __init__(self, operation_name: str, root: str, fields: tuple = (), variables: dict = None):
+        """A graphql query selecting exactly the declared fields
+
+        Args:
+            operation_name (str): graphql operation name
+            root (str): root field of the query
+            fields (tuple, optional): declared fields of the root, see render_selection. Defaults to ().
+            variables (dict, optional): variable names mapped to their graphql types. Defaults to None.
+        """
+        self.operation_name = operation_name
+        self.root = root
+        self.fields = fields
+        self.variables = variables or {}
+
+        signature = ''
+        arguments = ''
+        if self.variables:
+            signature = '(' + ', '.join(f'${name}: {type_}' for name, type_ in self.variables.items()) + ')'
+            arguments = '(' + ', '.join(f'{name}: ${name}' for name in self.variables) + ')'
+        self.query = f'query {operation_name}{signature} {{{root}{arguments} {render_selection(fields)}}}'
+
+QUESTION_FIELDS = (
+    'questionFrontendId',
+    'title',
+    'titleSlug',
+    'difficulty',
+    'paidOnly: isPaidOnly',
+    'hasSolution',
+    {'topicTags': ('name', 'slug')},
+    'similarQuestions',
+    'likes',
+    'dislikes',
+    'acRate'
+)
+
+QUERIES = {
+    # cookie validation
+    'user_status': GraphQLQuery('globalData', 'userStatus', ('isSignedIn', 'username')),
+    # daily challenge embed and submission validation
+    'daily_challenge': GraphQLQuery(
+        'questionOfToday',
+        'activeDailyCodingChallengeQuestion',
+        ('date', 'link', {'question': QUESTION_FIELDS})
+    ),
+    # question embed
+    'question': GraphQLQuery(
+        'questionData',
+        'question',
+        QUESTION_FIELDS,
+        {'titleSlug': 'String!'}
+    ),
+    # background refresh of the volatile question fields
+    'question_stats': GraphQLQuery(
+        'questionStats',
+        'question',
+        ('likes', 'dislikes', 'acRate'),
+        {'titleSlug': 'String!'}
+    ),
+    # submission embed
+    'submission': GraphQLQuery(
+        'submissionDetails',
+        'submissionDetails',
+        (
+            'statusCode',
+            'runtimeDisplay',
+            'runtimePercentile',
+            'memoryDisplay',
+            'memoryPercentile',
+            'code',
+            'timestamp',
+            'notes',
+            {'user': ('username', {'profile': ('userAvatar',)})},
+            {'lang': ('verboseName',)},
+            {'question': ('questionFrontendId', 'title', 'titleSlug', 'difficulty', 'paidOnly: isPaidOnly')},
+            {'topicTags': ('slug', 'name')}
+        ),
+        {'submissionId': 'Int!'}
+    )
+}
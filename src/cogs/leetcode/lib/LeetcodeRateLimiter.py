@@ -0,0 +1,133 @@
+#!/usr/bin/env python
+# -*-coding:utf-8 -*-
+'''
+@File      :    LeetcodeRateLimiter.py
+@Time      :    2023/07/03
+@Author    :    Feiyu Zheng
+@Version   :    1.0
+@Contact   :    feiyuzheng98@gmail.com
+@License   :    Copyright (c) 2023-present Feiyu Zheng. All rights reserved.
+                This work is licensed under the terms of the MIT license.
+                For a copy, see <https://opensource.org/licenses/MIT>.
+@Desc      :    None
+'''
+
+import asyncio
+from enum import IntEnum
+import heapq
+import itertools
+import time
+
+class RequestPriority(IntEnum):
+    SCHEDULED = 0
+    USER = 1
+    BACKGROUND = 2
+
+class RateLimiter:
+    __slots__ = ('rate', 'burst', '_tokens', '_updated_at', '_paused_until', '_waiters', '_counter', '_dispatcher', '_acquired', '_total_wait', '_max_wait')
+
+    def __init__(self, rate: float = 5.0, burst: int = 10):
+        """A token bucket granting tokens to the waiters with the highest priority first
+
+        Args:
+            rate (float, optional): tokens refilled per second. Defaults to 5.0.
+            burst (int, optional): bucket capacity. Defaults to 10.
+        """
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated_at = time.monotonic()
+        self._paused_until = 0.0
+        self._waiters = []
+        self._counter = itertools.count()
+        self._dispatcher = None
+        self._acquired = 0
+        self._total_wait = 0.0
+        self._max_wait = 0.0
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(float(self.burst), self._tokens + (now - self._updated_at) * self.rate)
+        self._updated_at = now
+
+    def _delay(self) -> float:
+        """Seconds until a token can be granted"""
+        self._refill()
+        delay = max(0.0, self._paused_until - time.monotonic())
+        if self._tokens < 1:
+            delay = max(delay, (1 - self._tokens) / self.rate)
+        return delay
+
+    async def acquire(self, priority: RequestPriority = RequestPriority.USER) -> float:
+        """Wait for a token
+
+        Args:
+            priority (RequestPriority, optional): priority class of the request. Defaults to RequestPriority.USER.
+
+        Returns:
+            float: seconds spent waiting
+        """
+        start = time.monotonic()
+        if not self._waiters and self._delay() == 0:
+            self._tokens -= 1
+        else:
+            future = asyncio.get_running_loop().create_future()
+            heapq.heappush(self._waiters, (int(priority), next(self._counter), future))
+            if self._dispatcher is None or self._dispatcher.done():
+                self._dispatcher = asyncio.ensure_future(self._dispatch())
+            await future
+
+        waited = time.monotonic() - start
+        self._acquired += 1
+        self._total_wait += waited
+        self._max_wait = max(self._max_wait, waited)
+        return waited
+
+    def try_acquire(self) -> bool:
+        """Take a token only if one is available right away
+
+        Returns:
+            bool: whether a token was taken
+        """
+        if self._waiters or self._delay() > 0:
+            return False
+        self._tokens -= 1
+        self._acquired += 1
+        return True
+
+    async def _dispatch(self) -> None:
+        while self._waiters:
+            delay = self._delay()
+            if delay > 0:
+                await asyncio.sleep(delay)
+                continue
+            _, _, future = heapq.heappop(self._waiters)
+            if future.done():
+                # the waiter was cancelled
+                continue
+            self._tokens -= 1
+            future.set_result(None)
+
+    def pause(self, delay: float) -> None:
+        """Stop granting tokens for a while, e.g. when leetcode answers with Retry-After
+
+        Args:
+            delay (float): seconds to pause
+        """
+        self._paused_until = max(self._paused_until, time.monotonic() + delay)
+
+    def queue_depth(self) -> dict:
+        depth = {priority.name.lower(): 0 for priority in RequestPriority}
+        for priority, _, future in self._waiters:
+            if not future.done():
+                depth[RequestPriority(priority).name.lower()] += 1
+        return depth
+
+    def stats(self) -> dict:
+        return {
+            'queue_depth': self.queue_depth(),
+            'acquired': self._acquired,
+            'average_wait': self._total_wait / self._acquired if self._acquired else 0.0,
+            'max_wait': self._max_wait,
+            'paused_for': max(0.0, self._paused_until - time.monotonic())
+        }
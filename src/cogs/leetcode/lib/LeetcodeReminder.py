@@ -0,0 +1,187 @@
+#!/usr/bin/env python
+# -*-coding:utf-8 -*-
+'''
+@File      :    LeetcodeReminder.py
+@Time      :    2023/07/14
+@Author    :    Feiyu Zheng
+@Version   :    1.0
+@Contact   :    feiyuzheng98@gmail.com
+@License   :    Copyright (c) 2023-present Feiyu Zheng. All rights reserved.
+                This work is licensed under the terms of the MIT license.
+                For a copy, see <https://opensource.org/licenses/MIT>.
+@Desc      :    None
+'''
+
+import asyncio
+from datetime import datetime, time as dtime, timedelta
+from enum import Enum
+import heapq
+import itertools
+import time
+from typing import Awaitable, Callable, Dict, Hashable, List, Optional, Tuple, Type
+
+import pytz
+
+from lib.IODict import IODict, WriteBehindPolicy
+from utils.io_utils import load_data
+
+class ReminderDelivery(Enum):
+    DM = 'dm'
+    MENTION = 'mention'
+
+class PersonalReminderDict(IODict):
+    __slots__ = ()
+
+    def __init__(
+        self,
+        file_path: str,
+        sync: bool = True,
+        write_behind: Optional[WriteBehindPolicy] = None
+    ):
+        """An IODict subclass mapping '<guild id> <user id>' to the personal reminder of a participant
+
+        Every reminder holds its timezone, its packed time of day and its delivery.
+
+        Args:
+            file_path (str): reminder file path
+            sync (bool, optional): whether sync to the file. Defaults to True.
+            write_behind (Optional[WriteBehindPolicy], optional): write-behind policy, writes through if None. Defaults to None.
+        """
+        super().__init__(file_path, sync, write_behind)
+
+    @classmethod
+    def from_file(
+        cls: Type['PersonalReminderDict'],
+        file_path: str,
+        write_behind: Optional[WriteBehindPolicy] = None
+    ) -> 'PersonalReminderDict':
+        """static method to create a PersonalReminderDict instance from file
+
+        Args:
+            cls (Type['PersonalReminderDict']): PersonalReminderDict constructor
+            file_path (str): reminder file path
+            write_behind (Optional[WriteBehindPolicy], optional): write-behind policy, writes through if None. Defaults to None.
+
+        Returns:
+            PersonalReminderDict: PersonalReminderDict instance
+        """
+        d = cls(file_path, sync=False, write_behind=write_behind)
+        for k, v in load_data(file_path).items():
+            dict.__setitem__(d, k, v)
+        return d
+
+    @staticmethod
+    def make_key(guild_id: int, user_id: int) -> str:
+        return f'{guild_id} {user_id}'
+
+    @staticmethod
+    def split_key(key: str) -> Tuple[int, int]:
+        guild_id, user_id = key.split(' ')
+        return int(guild_id), int(user_id)
+
+def next_occurrence(timezone: str, seconds: int, now: Optional[float] = None) -> float:
+    """Get the next unix time a time of day occurs in a timezone
+
+    Args:
+        timezone (str): timezone name
+        seconds (int): time of day in seconds
+        now (Optional[float], optional): unix time to start from. Defaults to None for the current time.
+
+    Returns:
+        float: unix time strictly after now
+    """
+    tz = pytz.timezone(timezone)
+    now = time.time() if now is None else now
+    today = datetime.fromtimestamp(now, tz).date()
+    time_of_day = dtime(seconds // 3600, seconds // 60 % 60, seconds % 60)
+    # a time skipped by a dst change still resolves within three days
+    for offset in range(3):
+        occurrence = tz.normalize(tz.localize(datetime.combine(today + timedelta(days=offset), time_of_day))).timestamp()
+        if occurrence > now:
+            return occurrence
+    return now + 24 * 60 * 60
+
+class ReminderTimer:
+    __slots__ = ('callback', '_heap', '_entries', '_counter', '_wakeup', '_task', '_batches')
+
+    def __init__(self, callback: Callable[[List[Hashable]], Awaitable]):
+        """A single timer on the event loop firing any number of keyed reminders
+
+        Pending reminders sit in a heap ordered by due time, and one task sleeps until the
+        earliest of them. Every reminder due at the same wakeup is handed to callback in one
+        batch. Cancelled and rescheduled reminders are dropped lazily when they reach the top
+        of the heap.
+
+        Args:
+            callback (Callable[[List[Hashable]], Awaitable]): coroutine function receiving the keys of the due reminders
+        """
+        self.callback = callback
+        self._heap: List[Tuple[float, int, Hashable]] = []
+        # key -> sequence number of its live heap entry
+        self._entries: Dict[Hashable, int] = {}
+        self._counter = itertools.count()
+        self._wakeup = asyncio.Event()
+        self._task = None
+        self._batches = set()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._entries
+
+    def schedule(self, key: Hashable, due: float) -> None:
+        """Schedule a reminder, replacing its pending one if any
+
+        Args:
+            key (Hashable): reminder key
+            due (float): unix time the reminder fires at
+        """
+        sequence = next(self._counter)
+        self._entries[key] = sequence
+        heapq.heappush(self._heap, (due, sequence, key))
+        if self._heap[0][1] == sequence:
+            # the timer sleeps until a later reminder
+            self._wakeup.set()
+        if len(self._heap) > 2 * len(self._entries) + 1024:
+            self._compact()
+
+    def cancel(self, key: Hashable) -> None:
+        self._entries.pop(key, None)
+
+    def _compact(self) -> None:
+        self._heap = [entry for entry in self._heap if self._entries.get(entry[2]) == entry[1]]
+        heapq.heapify(self._heap)
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.ensure_future(self._run())
+
+    def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+        for batch in self._batches:
+            batch.cancel()
+
+    async def _run(self) -> None:
+        while True:
+            self._wakeup.clear()
+            now = time.time()
+            due = []
+            while self._heap and self._heap[0][0] <= now:
+                _, sequence, key = heapq.heappop(self._heap)
+                if self._entries.get(key) == sequence:
+                    del self._entries[key]
+                    due.append(key)
+            if due:
+                # the next reminders must not wait for this batch to be delivered
+                batch = asyncio.ensure_future(self.callback(due))
+                self._batches.add(batch)
+                batch.add_done_callback(self._batches.discard)
+            while self._heap and self._entries.get(self._heap[0][2]) != self._heap[0][1]:
+                heapq.heappop(self._heap)
+            timeout = self._heap[0][0] - time.time() if self._heap else None
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
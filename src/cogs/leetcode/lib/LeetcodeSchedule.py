@@ -0,0 +1,576 @@
+#!/usr/bin/env python
+# -*-coding:utf-8 -*-
+'''
+@File      :    LeetcodeSchedule.py
+@Time      :    2023/07/12
+@Author    :    Feiyu Zheng
+@Version   :    1.0
+@Contact   :    feiyuzheng98@gmail.com
+@License   :    Copyright (c) 2023-present Feiyu Zheng. All rights reserved.
+                This work is licensed under the terms of the MIT license.
+                For a copy, see <https://opensource.org/licenses/MIT>.
+@Desc      :    None
+'''
+
+import asyncio
+import bisect
+from collections import deque
+from contextvars import ContextVar
+from datetime import datetime, timedelta
+from enum import Enum
+import time
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional, Tuple, Type
+
+from apscheduler.schedulers.base import BaseScheduler
+from apscheduler.triggers.cron import CronTrigger
+import discord
+
+from cogs.leetcode.lib.LeetcodeTime import cron_time, format_time
+from lib.IODict import IODict
+from utils.io_utils import load_data
+
+class MisfirePolicy(Enum):
+    # a missed firing is dropped, e.g. an announcement that is stale after the downtime
+    SKIP = 'skip'
+    # the last missed firing runs once after the downtime
+    RUN_ONCE = 'run once'
+
+class ScheduleStateDict(IODict):
+    __slots__ = ()
+
+    def __init__(self, file_path: str, sync: bool = True, journal_max_size: Optional[int] = 64 * 1024):
+        """An IODict subclass mapping the job id of every bucket to the unix time it last completed
+
+        A bucket that never ran maps to the time it was created, so that the firings missed
+        while the bot was down can be told apart from the ones before the bucket existed.
+
+        While a bucket runs, '<job id>|<guild id>' maps to the planned fire time for every guild
+        done so far, so that a run interrupted by a crash resumes with the remaining guilds only.
+        These per guild records are appended to the journal.
+
+        Args:
+            file_path (str): state file path
+            sync (bool, optional): whether sync to the file. Defaults to True.
+            journal_max_size (Optional[int], optional): journal size in bytes triggering a compaction. Defaults to 64KB.
+        """
+        super().__init__(file_path, sync, journal_max_size=journal_max_size)
+
+    @classmethod
+    def from_file(cls: Type['ScheduleStateDict'], file_path: str) -> 'ScheduleStateDict':
+        """static method to create a ScheduleStateDict instance from file
+
+        Args:
+            cls (Type['ScheduleStateDict']): ScheduleStateDict constructor
+            file_path (str): state file path
+
+        Returns:
+            ScheduleStateDict: ScheduleStateDict instance
+        """
+        d = cls(file_path, sync=False)
+        for k, v in load_data(file_path).items():
+            dict.__setitem__(d, k, v)
+        d.replay_journal()
+        return d
+
+def previous_fire_time(trigger: CronTrigger, now: datetime) -> Optional[datetime]:
+    """Get the last time a daily trigger fired at or before now"""
+    fire_time = trigger.get_next_fire_time(None, now - timedelta(days=1))
+    return fire_time if fire_time is not None and fire_time <= now else None
+
+class ScheduleBuckets:
+    __slots__ = ('scheduler', 'callback', 'state', 'job_kwargs', '_buckets', '_memberships', '_running')
+
+    MISFIRE_POLICIES = {
+        'start': MisfirePolicy.SKIP,
+        'remind': MisfirePolicy.SKIP,
+        # the daily report is only reset and reported by the end phase
+        'end': MisfirePolicy.RUN_ONCE
+    }
+
+    def __init__(
+        self,
+        scheduler: BaseScheduler,
+        callback: Callable[[str, str, int], Awaitable],
+        state: Optional[ScheduleStateDict] = None,
+        **job_kwargs
+    ):
+        """Guild schedules grouped into one cron job per distinct (phase, timezone, time of day)
+
+        The job of a bucket calls callback(phase, timezone, seconds) once per firing, which fans out
+        to the member guilds, so the number of jobs grows with the distinct schedules instead of
+        the guilds.
+
+        Args:
+            scheduler (BaseScheduler): scheduler running the bucket jobs
+            callback (Callable[[str, str, int], Awaitable]): coroutine function running a phase for the members of a bucket
+            state (Optional[ScheduleStateDict], optional): last run of every bucket, misfires are not tracked if None. Defaults to None.
+            job_kwargs: extra keyword arguments of every add_job call
+        """
+        self.scheduler = scheduler
+        self.callback = callback
+        self.state = state
+        self.job_kwargs = job_kwargs
+        # (phase, timezone, seconds) -> member guild ids in insertion order
+        self._buckets: Dict[Tuple[str, str, int], Dict[int, None]] = {}
+        # (guild id, phase) -> bucket key
+        self._memberships: Dict[Tuple[int, str], Tuple[str, str, int]] = {}
+        # buckets whose run has started and not completed yet
+        self._running = set()
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+    @staticmethod
+    def job_id(phase: str, timezone: str, seconds: int) -> str:
+        return f'leetcode {phase} {timezone} {format_time(seconds)}'
+
+    def add(self, guild_id: int, phase: str, timezone: str, seconds: int) -> None:
+        """Move a guild phase into the bucket of its timezone and time, creating the bucket job if needed
+
+        Args:
+            guild_id (int): guild id
+            phase (str): start, remind or end
+            timezone (str): timezone of the time
+            seconds (int): time of day in seconds
+        """
+        key = (phase, timezone, seconds)
+        if self._memberships.get((guild_id, phase)) == key:
+            return
+        members = self._buckets.get(key)
+        if members is None:
+            # the job is added first, an invalid timezone raises before anything is registered
+            job_id = self.job_id(*key)
+            self.scheduler.add_job(
+                self.callback,
+                CronTrigger(**cron_time(seconds), timezone=timezone),
+                args=key,
+                id=job_id,
+                replace_existing=True,
+                **self.job_kwargs
+            )
+            members = self._buckets[key] = {}
+            if self.state is not None and job_id not in self.state:
+                self.state[job_id] = time.time()
+        self.remove(guild_id, phase)
+        members[guild_id] = None
+        self._memberships[(guild_id, phase)] = key
+
+    def remove(self, guild_id: int, phase: str) -> None:
+        """Take a guild phase out of its bucket, removing the bucket job once it has no member"""
+        key = self._memberships.pop((guild_id, phase), None)
+        if key is None:
+            return
+        members = self._buckets[key]
+        members.pop(guild_id, None)
+        if not members:
+            del self._buckets[key]
+            job_id = self.job_id(*key)
+            if self.scheduler.get_job(job_id):
+                self.scheduler.remove_job(job_id)
+            if self.state is not None:
+                with self.state.transaction():
+                    for state_key in [job_id] + self._progress_keys(job_id):
+                        if state_key in self.state:
+                            del self.state[state_key]
+
+    def get(self, guild_id: int, phase: str) -> Optional[Tuple[str, int]]:
+        """Get the (timezone, seconds) a guild phase is scheduled at, None if not scheduled"""
+        key = self._memberships.get((guild_id, phase))
+        return None if key is None else key[1:]
+
+    def members(self, phase: str, timezone: str, seconds: int) -> List[int]:
+        return list(self._buckets.get((phase, timezone, seconds), ()))
+
+    def guild_count(self) -> int:
+        return len({guild_id for guild_id, _ in self._memberships})
+
+    @staticmethod
+    def planned_time(timezone: str, seconds: int, now: Optional[datetime] = None) -> Optional[datetime]:
+        """Get the fire time a bucket job firing now was planned for"""
+        return previous_fire_time(CronTrigger(**cron_time(seconds), timezone=timezone), now or datetime.now().astimezone())
+
+    def last_run(self, phase: str, timezone: str, seconds: int) -> Optional[float]:
+        """Get the unix time a bucket last ran, or was created if it never ran"""
+        if self.state is None:
+            return None
+        return self.state.get(self.job_id(phase, timezone, seconds))
+
+    def _progress_keys(self, job_id: str) -> List[str]:
+        prefix = job_id + '|'
+        return [state_key for state_key in self.state if state_key.startswith(prefix)]
+
+    def start_run(self, phase: str, timezone: str, seconds: int) -> bool:
+        """Mark a bucket as running
+
+        Returns:
+            bool: False if the bucket is running already, e.g. fired while its catch-up runs
+        """
+        key = (phase, timezone, seconds)
+        if key in self._running:
+            return False
+        self._running.add(key)
+        return True
+
+    def mark_done(self, phase: str, timezone: str, seconds: int, guild_id: int, planned: Optional[float]) -> None:
+        """Record that a guild completed the run of a bucket planned at a fire time"""
+        if self.state is not None and planned is not None:
+            self.state[f'{self.job_id(phase, timezone, seconds)}|{guild_id}'] = planned
+
+    def done_guilds(self, phase: str, timezone: str, seconds: int, planned: Optional[float]) -> set:
+        """Get the guilds that already completed the run of a bucket planned at a fire time"""
+        if self.state is None or planned is None:
+            return set()
+        return {
+            int(state_key.rsplit('|', 1)[1])
+            for state_key in self._progress_keys(self.job_id(phase, timezone, seconds))
+            if self.state[state_key] == planned
+        }
+
+    def finish_run(self, phase: str, timezone: str, seconds: int, completed: bool = True) -> None:
+        """Mark a bucket as no longer running, and record its run if it completed
+
+        A run that did not complete keeps its progress, the guilds left are run by the catch-up.
+        """
+        self._running.discard((phase, timezone, seconds))
+        if self.state is None or not completed:
+            return
+        job_id = self.job_id(phase, timezone, seconds)
+        with self.state.transaction():
+            for state_key in self._progress_keys(job_id):
+                del self.state[state_key]
+            self.state[job_id] = time.time()
+
+    def missed(self, now: Optional[datetime] = None) -> List[Tuple[datetime, str, str, int]]:
+        """Get the buckets whose last firing was missed and must run once by their misfire policy
+
+        Args:
+            now (Optional[datetime], optional): aware datetime to compare to. Defaults to None for the current time.
+
+        Returns:
+            List[Tuple[datetime, str, str, int]]: missed fire time, phase, timezone and seconds of every bucket, oldest first
+        """
+        if self.state is None:
+            return []
+        now = now or datetime.now().astimezone()
+        missed = []
+        for phase, timezone, seconds in self._buckets:
+            if self.MISFIRE_POLICIES.get(phase, MisfirePolicy.SKIP) is not MisfirePolicy.RUN_ONCE or (phase, timezone, seconds) in self._running:
+                continue
+            last_run = self.state.get(self.job_id(phase, timezone, seconds))
+            fire_time = previous_fire_time(CronTrigger(**cron_time(seconds), timezone=timezone), now)
+            if last_run is not None and fire_time is not None and last_run < fire_time.timestamp():
+                missed.append((fire_time, phase, timezone, seconds))
+        missed.sort(key=lambda item: item[0])
+        return missed
+
+    def prune_state(self) -> int:
+        """Drop the state of the buckets that no longer exist
+
+        Returns:
+            int: number of entries dropped
+        """
+        if self.state is None:
+            return 0
+        job_ids = {self.job_id(*key) for key in self._buckets}
+        stale = [state_key for state_key in self.state if state_key.split('|', 1)[0] not in job_ids]
+        with self.state.transaction():
+            for state_key in stale:
+                del self.state[state_key]
+        return len(stale)
+
+class Histogram:
+    __slots__ = ('bounds', 'counts', 'count', 'total', 'max')
+
+    DEFAULT_BOUNDS = (0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0)
+
+    def __init__(self, bounds: Tuple[float, ...] = DEFAULT_BOUNDS):
+        """Counts of observations in seconds, one bucket per upper bound plus an overflow bucket
+
+        Args:
+            bounds (Tuple[float, ...], optional): ascending bucket upper bounds in seconds. Defaults to DEFAULT_BOUNDS.
+        """
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def record(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.total += value
+        self.max = max(self.max, value)
+
+    def percentile(self, p: float) -> Optional[float]:
+        """Get the upper bound of the bucket holding a percentile, capped by the max recorded value
+
+        Args:
+            p (float): percentile between 0 and 1
+
+        Returns:
+            Optional[float]: seconds, None if nothing was recorded
+        """
+        if self.count == 0:
+            return None
+        rank = p * self.count
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank and count > 0:
+                return min(self.bounds[index], self.max) if index < len(self.bounds) else self.max
+        return self.max
+
+    def to_dict(self) -> dict:
+        return {
+            'count': self.count,
+            'average': self.total / self.count if self.count else None,
+            'max': self.max,
+            'p50': self.percentile(0.5),
+            'p95': self.percentile(0.95),
+            'p99': self.percentile(0.99),
+            'buckets': {
+                **{f'le_{bound:g}': count for bound, count in zip(self.bounds, self.counts)},
+                'overflow': self.counts[-1]
+            }
+        }
+
+class PhaseMetrics:
+    __slots__ = ('histograms', 'runs', 'failures', 'guilds', 'recent_failures')
+
+    METRICS = ('lag', 'duration', 'send_latency')
+
+    def __init__(self, recent_failure_count: int = 50):
+        """Lag, duration, send latency and failures of the scheduled phases
+
+        Lag is the delay between the planned fire time of a phase and the start of a guild's run,
+        duration is the run time of a guild and send latency the time a discord message takes.
+
+        Args:
+            recent_failure_count (int, optional): number of recent failures kept. Defaults to 50.
+        """
+        # phase -> metric -> histogram
+        self.histograms: Dict[str, Dict[str, Histogram]] = {}
+        self.runs: Dict[str, int] = {}
+        self.failures: Dict[str, int] = {}
+        # guild id -> last run of the guild
+        self.guilds: Dict[int, dict] = {}
+        self.recent_failures = deque(maxlen=recent_failure_count)
+
+    def histogram(self, phase: str, metric: str) -> Histogram:
+        histograms = self.histograms.get(phase)
+        if histograms is None:
+            histograms = self.histograms[phase] = {metric: Histogram() for metric in self.METRICS}
+        return histograms[metric]
+
+    def record_run(self, phase: str) -> None:
+        self.runs[phase] = self.runs.get(phase, 0) + 1
+
+    def record_guild(self, phase: str, guild_id: int, planned: Optional[float], started: float, duration: float, error: Optional[Exception] = None) -> None:
+        """Record the run of a phase in a guild
+
+        Args:
+            phase (str): phase name
+            guild_id (int): guild id
+            planned (Optional[float]): unix time the phase was planned to fire, None if unknown
+            started (float): unix time the guild's run started
+            duration (float): run time in seconds
+            error (Optional[Exception], optional): error the run failed with. Defaults to None.
+        """
+        lag = None if planned is None else max(0.0, started - planned)
+        if lag is not None:
+            self.histogram(phase, 'lag').record(lag)
+        self.histogram(phase, 'duration').record(duration)
+        self.guilds[guild_id] = {
+            'phase': phase,
+            'planned': planned,
+            'started': started,
+            'lag': lag,
+            'duration': duration,
+            'error': None if error is None else str(error)
+        }
+        if error is not None:
+            self.failures[phase] = self.failures.get(phase, 0) + 1
+            self.recent_failures.append({'phase': phase, 'guild_id': guild_id, 'time': started, 'error': str(error)})
+
+    def record_send(self, phase: str, latency: float) -> None:
+        self.histogram(phase, 'send_latency').record(latency)
+
+    def snapshot(self) -> dict:
+        return {
+            'time': time.time(),
+            'phases': {
+                phase: {
+                    'runs': self.runs.get(phase, 0),
+                    'failures': self.failures.get(phase, 0),
+                    **{metric: histogram.to_dict() for metric, histogram in histograms.items()}
+                }
+                for phase, histograms in self.histograms.items()
+            },
+            'guilds': {str(guild_id): record for guild_id, record in self.guilds.items()},
+            'recent_failures': list(self.recent_failures)
+        }
+
+class FanoutReport:
+    __slots__ = ('phase', 'planned', 'total', 'done', 'failed', 'retries', 'messages', 'started_at', 'last_message_at', 'finished_at')
+
+    def __init__(self, phase: str, total: int):
+        self.phase = phase
+        self.planned = None
+        self.total = total
+        self.done = 0
+        # guild id -> error
+        self.failed: Dict[int, Exception] = {}
+        self.retries = 0
+        self.messages = 0
+        self.started_at = time.monotonic()
+        self.last_message_at = None
+        self.finished_at = None
+
+    @property
+    def time_to_last_message(self) -> Optional[float]:
+        return None if self.last_message_at is None else self.last_message_at - self.started_at
+
+    @property
+    def duration(self) -> float:
+        return (self.finished_at or time.monotonic()) - self.started_at
+
+    def to_dict(self) -> dict:
+        return {
+            'phase': self.phase,
+            'total': self.total,
+            'done': self.done,
+            'failed': len(self.failed),
+            'retries': self.retries,
+            'messages': self.messages,
+            'time_to_last_message': self.time_to_last_message,
+            'duration': self.duration
+        }
+
+class PhaseFanout:
+    __slots__ = ('concurrency', 'max_retries', 'default_retry_after', 'metrics', '_semaphore', '_guild_locks', '_paused_until', '_report')
+
+    def __init__(self, concurrency: int = 16, max_retries: int = 3, default_retry_after: float = 1.0, metrics: Optional[PhaseMetrics] = None):
+        """Runs a scheduled phase for many guilds with bounded concurrency
+
+        Overlapping runs of the same guild, e.g. two phases set to the same time, run one after
+        another so their messages stay in order, and messages sent through send are retried when
+        discord answers with 429.
+
+        Args:
+            concurrency (int, optional): guilds running at the same time. Defaults to 16.
+            max_retries (int, optional): retries of a rate limited message. Defaults to 3.
+            default_retry_after (float, optional): seconds to wait when a 429 carries no reset time. Defaults to 1.0.
+            metrics (Optional[PhaseMetrics], optional): where the runs and sends are recorded. Defaults to None.
+        """
+        self.concurrency = concurrency
+        self.max_retries = max_retries
+        self.default_retry_after = default_retry_after
+        self.metrics = metrics
+        self._semaphore = asyncio.Semaphore(concurrency)
+        # guild id -> [lock, number of runs holding or waiting for it]
+        self._guild_locks: Dict[int, list] = {}
+        self._paused_until = 0.0
+        # report of the run the current task belongs to
+        self._report: ContextVar[Optional[FanoutReport]] = ContextVar('fanout_report', default=None)
+
+    async def run(self, phase: str, items: Iterable[Tuple[int, Callable[[], Awaitable]]], planned: Optional[float] = None) -> FanoutReport:
+        """Run a phase for every guild and wait for all of them
+
+        Args:
+            phase (str): phase name used in the report
+            items (Iterable[Tuple[int, Callable[[], Awaitable]]]): guild id and coroutine function of each guild
+            planned (Optional[float], optional): unix time the phase was planned to fire, for the lag metric. Defaults to None.
+
+        Returns:
+            FanoutReport: completion report of the run
+        """
+        items = list(items)
+        report = FanoutReport(phase, len(items))
+        report.planned = planned
+        if self.metrics is not None:
+            self.metrics.record_run(phase)
+        token = self._report.set(report)
+        try:
+            # tasks copy the current context, so send finds the report of this run
+            await asyncio.gather(*(self._run_guild(report, *item) for item in items))
+        finally:
+            self._report.reset(token)
+        report.finished_at = time.monotonic()
+        return report
+
+    async def _run_guild(self, report: FanoutReport, guild_id: int, func: Callable[[], Awaitable]) -> None:
+        entry = self._guild_locks.get(guild_id)
+        if entry is None:
+            entry = self._guild_locks[guild_id] = [asyncio.Lock(), 0]
+        entry[1] += 1
+        try:
+            # a guild waiting for its previous run does not take a concurrency slot
+            async with entry[0]:
+                await self._run_guild_limited(report, guild_id, func)
+        finally:
+            entry[1] -= 1
+            if entry[1] == 0:
+                del self._guild_locks[guild_id]
+
+    async def _run_guild_limited(self, report: FanoutReport, guild_id: int, func: Callable[[], Awaitable]) -> None:
+        async with self._semaphore:
+            error = None
+            started = time.time()
+            start = time.monotonic()
+            try:
+                await func()
+            except Exception as e:
+                error = e
+                report.failed[guild_id] = e
+            else:
+                report.done += 1
+            if self.metrics is not None:
+                self.metrics.record_guild(report.phase, guild_id, report.planned, started, time.monotonic() - start, error)
+
+    async def send(self, messageable: discord.abc.Messageable, *args, **kwargs) -> discord.Message:
+        """Send a message, waiting out the reset time of the rate limit bucket on 429
+
+        Args:
+            messageable (discord.abc.Messageable): where to send the message
+            args, kwargs: arguments of messageable.send
+
+        Returns:
+            discord.Message: the sent message
+        """
+        report = self._report.get()
+        for attempt in range(self.max_retries + 1):
+            delay = self._paused_until - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            start = time.monotonic()
+            try:
+                message = await messageable.send(*args, **kwargs)
+            except (discord.RateLimited, discord.HTTPException) as e:
+                retry_after = self.retry_after(e)
+                if retry_after is None or attempt == self.max_retries:
+                    raise
+                if report is not None:
+                    report.retries += 1
+                # the other guilds would hit the same limit, hold all of them back
+                self._paused_until = max(self._paused_until, time.monotonic() + retry_after)
+            else:
+                if report is not None:
+                    report.messages += 1
+                    report.last_message_at = time.monotonic()
+                    if self.metrics is not None:
+                        self.metrics.record_send(report.phase, report.last_message_at - start)
+                return message
+
+    def retry_after(self, error: Exception) -> Optional[float]:
+        """Seconds until the rate limit bucket resets, None if the error is not a rate limit"""
+        if isinstance(error, discord.RateLimited):
+            return error.retry_after
+        if isinstance(error, discord.HTTPException) and error.status == 429:
+            headers = getattr(error.response, 'headers', None) or {}
+            for header in ('X-RateLimit-Reset-After', 'Retry-After'):
+                try:
+                    return max(0.0, float(headers[header]))
+                except (KeyError, ValueError):
+                    pass
+            return self.default_retry_after
+        return None
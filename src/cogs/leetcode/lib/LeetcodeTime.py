@@ -0,0 +1,71 @@
+#!/usr/bin/env python
+# -*-coding:utf-8 -*-
+'''
+@File      :    LeetcodeTime.py
+@Time      :    2023/07/10
+@Author    :    Feiyu Zheng
+@Version   :    1.0
+@Contact   :    feiyuzheng98@gmail.com
+@License   :    Copyright (c) 2023-present Feiyu Zheng. All rights reserved.
+                This work is licensed under the terms of the MIT license.
+                For a copy, see <https://opensource.org/licenses/MIT>.
+@Desc      :    None
+'''
+
+from typing import Union
+
+def pack_time(hour: int, minute: int = 0, second: int = 0) -> int:
+    """Pack a time of day into seconds of the day
+
+    Args:
+        hour (int): hour of a day (0-23)
+        minute (int, optional): minute of a hour (0-59). Defaults to 0.
+        second (int, optional): second of a minute (0-59). Defaults to 0.
+
+    Returns:
+        int: seconds of the day
+    """
+    return int(hour) * 3600 + int(minute) * 60 + int(second)
+
+def parse_time(value: Union[int, dict]) -> int:
+    """Get the seconds of the day of a packed time or of a stored {'hour': "HH", 'minute': "MM", 'second': "SS"} time
+
+    Args:
+        value (Union[int, dict]): packed or stored time
+
+    Returns:
+        int: seconds of the day
+    """
+    if isinstance(value, dict):
+        return pack_time(value['hour'], value['minute'], value['second'])
+    return int(value)
+
+def unpack_time(seconds: int) -> dict:
+    """Expand seconds of the day into the stored time layout
+
+    Args:
+        seconds (int): seconds of the day
+
+    Returns:
+        dict: {'hour': "HH", 'minute': "MM", 'second': "SS"}
+    """
+    hour, minute, second = cron_time(seconds).values()
+    return {'hour': f'{hour:02d}', 'minute': f'{minute:02d}', 'second': f'{second:02d}'}
+
+def cron_time(seconds: int) -> dict:
+    """Expand seconds of the day into CronTrigger fields
+
+    Args:
+        seconds (int): seconds of the day
+
+    Returns:
+        dict: {'hour': hour, 'minute': minute, 'second': second}
+    """
+    minutes, second = divmod(seconds, 60)
+    hour, minute = divmod(minutes, 60)
+    return {'hour': hour, 'minute': minute, 'second': second}
+
+def format_time(seconds: int) -> str:
+    """Format seconds of the day as HH:MM:SS"""
+    hour, minute, second = cron_time(seconds).values()
+    return f'{hour:02d}:{minute:02d}:{second:02d}'
@@ -12,28 +12,369 @@
 @Desc      :    None
 '''
 
+import asyncio
+import atexit
+from concurrent.futures import Future
+from contextlib import contextmanager
 from enum import Enum
+import json
+import os
+import time
+import traceback
+from typing import Optional
+import weakref
 
-from utils.io_utils import dump_data
+from utils.io_utils import dump_data, dump_data_in_background, in_event_loop
 
 class SerializationType(str, Enum):
     JSON = 'json'
     PKL = 'pkl'
+    MSGPACK = 'msgpack'
+
+    @property
+    def extension(self) -> str:
+        return '.' + self.value
+
+class WriteBehindPolicy:
+    __slots__ = ('flush_interval', 'max_delay')
+
+    def __init__(self, flush_interval: float = 5.0, max_delay: float = 30.0):
+        """When a write-behind IODict flushes its pending mutations
+
+        Args:
+            flush_interval (float, optional): seconds without mutations before flushing. Defaults to 5.0.
+            max_delay (float, optional): maximum seconds a mutation stays unflushed under continuous writes. Defaults to 30.0.
+        """
+        self.flush_interval = flush_interval
+        self.max_delay = max(max_delay, flush_interval)
+
+# value of an undo log entry for a key that did not exist
+MISSING = object()
+
+def apply_undo(d: dict, undo: dict) -> None:
+    """Restore the keys of an undo log to their values before a rolled back transaction"""
+    for key, value in undo.items():
+        if value is MISSING:
+            dict.pop(d, key, None)
+        else:
+            dict.__setitem__(d, key, value)
 
 class IODict(dict):
-    def __init__(self, file_path: str, sync: bool = True):
+    __slots__ = ('file_path', 'write_behind', 'journal_max_size', 'dirty', '_dirty_since', '_flush_handle', '_flush_task', '_writes_in_flight', '_compaction_task', '_transaction_depth', '_transaction_records', '_transaction_undo', '__weakref__')
+
+    # write-behind dicts with unflushed mutations, flushed at interpreter exit as a last resort
+    _pending = weakref.WeakSet()
+
+    def __init__(
+        self,
+        file_path: str,
+        sync: bool = True,
+        write_behind: Optional[WriteBehindPolicy] = None,
+        journal_max_size: Optional[int] = None
+    ):
+        """A dict persisting itself to a file on every mutation
+
+        Mutations on an event loop are written by the io thread pool, with the mutations of the
+        same loop iteration written together. In write-behind mode mutations only mark the dict
+        dirty and many of them are serialized together by a single flush.
+
+        In journal mode every mutation appends one record to '<file_path>.journal' instead, and the
+        journal is compacted into the file once it grows past journal_max_size bytes. The file
+        plus the journal are the current state, see replay_journal. The journal is not fsynced, it
+        survives a crash of the process but the last records may be lost with a power loss. Journal
+        mode takes precedence over write-behind mode.
+
+        Mutations inside a transaction are persisted together when it ends, see transaction.
+
+        Args:
+            file_path (str): file path
+            sync (bool, optional): whether sync to the file. Defaults to True.
+            write_behind (Optional[WriteBehindPolicy], optional): write-behind policy, writes through if None. Defaults to None.
+            journal_max_size (Optional[int], optional): journal size in bytes triggering a compaction, no journal if None. Defaults to None.
+        """
         super().__init__()
         self.file_path = file_path
+        self.write_behind = write_behind
+        self.journal_max_size = journal_max_size
+        self.dirty = False
+        self._dirty_since = 0.0
+        self._flush_handle = None
+        self._flush_task = None
+        self._writes_in_flight = 0
+        self._compaction_task = None
+        self._transaction_depth = 0
+        self._transaction_records = None
+        # key -> value before its first mutation in the transaction, MISSING if it was absent
+        self._transaction_undo = None
         if sync:
             self.sync()
 
+    def __hash__(self) -> int:
+        # identity hash so that instances can be tracked in a WeakSet
+        return id(self)
+
     def __setitem__(self, key, value) -> None:
+        self._record_undo(key)
         super().__setitem__(key, value)
-        self.sync()
-    
+        self._persist(('s', key, value))
+
     def __delitem__(self, key) -> None:
+        self._record_undo(key)
         super().__delitem__(key)
-        self.sync()
-    
-    def sync(self) -> None:
-        dump_data(data=self, file_path=self.file_path)
+        self._persist(('d', key))
+
+    def _record_undo(self, key) -> None:
+        if self._transaction_undo is not None and key not in self._transaction_undo:
+            self._transaction_undo[key] = dict.get(self, key, MISSING)
+
+    def _persist(self, record: tuple) -> None:
+        if self._transaction_depth > 0:
+            self._transaction_records.append(record)
+        elif self.journal_max_size is not None:
+            self.append_journal(record)
+        else:
+            self.mark_dirty()
+
+    @contextmanager
+    def transaction(self):
+        """Apply many mutations and persist them with a single write when the block ends
+
+        If the block raises, the dict is restored to its content before the block and
+        nothing is written. Nested transactions join the outermost one.
+
+        Example:
+            with store.transaction():
+                store[a] = 0
+                store[b] = 0
+        """
+        if self._transaction_depth > 0:
+            self._transaction_depth += 1
+            try:
+                yield self
+            finally:
+                self._transaction_depth -= 1
+            return
+
+        # an undo log of the touched keys instead of a copy, so that a transaction costs what it mutates
+        self._transaction_depth = 1
+        self._transaction_records = []
+        self._transaction_undo = {}
+        try:
+            yield self
+        except BaseException:
+            apply_undo(self, self._transaction_undo)
+            raise
+        finally:
+            self._transaction_depth = 0
+            records, self._transaction_records = self._transaction_records, None
+            self._transaction_undo = None
+        if not records:
+            return
+        if self.journal_max_size is not None:
+            # a single line, so that a torn write drops the whole transaction
+            self.append_journal(('b', records) if len(records) > 1 else records[0])
+        else:
+            self.mark_dirty()
+
+    def to_serializable(self):
+        """Get the content written to the file, subclasses storing values in a compact form expand them here"""
+        return self
+
+    def snapshot(self) -> dict:
+        """Copy the content written to the file, so that the io thread pool can serialize it while the dict changes
+
+        The values are shared with the dict, they are replaced on mutation and never changed in place.
+        """
+        data = self.to_serializable()
+        return dict(data) if data is self else data
+
+    @property
+    def journal_path(self) -> str:
+        return self.file_path + '.journal'
+
+    @property
+    def compacting_journal_path(self) -> str:
+        """Journal records being compacted into the file, they precede the records of the journal"""
+        return self.file_path + '.journal.compacting'
+
+    def append_journal(self, record: tuple) -> None:
+        """Append a mutation record to the journal and compact the journal if it got too large
+
+        The record is written to the page cache only, it survives a crash of the process but
+        not a power loss, which would cost the records appended since the last compaction.
+
+        Args:
+            record (tuple): ('s', key, value) for a set, ('d', key) for a delete or ('b', records) for a transaction
+        """
+        # opened per append, a handle kept by every resident dict would exhaust the file descriptors
+        with open(self.journal_path, 'a', encoding='utf-8') as journal:
+            journal.write(json.dumps(record, separators=(',', ':')) + '\n')
+            size = journal.tell()
+        if size > self.journal_max_size:
+            self.compact()
+
+    def compact(self) -> None:
+        """Write the whole dict to the file and drop the journal
+
+        On an event loop the journal is set aside and the file is written by the io thread pool,
+        new records go to a new journal meanwhile. The records set aside are only dropped once
+        the file and its directory are fsynced.
+        """
+        if self._compaction_task is not None and not self._compaction_task.done():
+            # the journal keeps growing until the running compaction is done
+            return
+        if not in_event_loop():
+            self.sync()
+            return
+
+        if os.path.exists(self.journal_path):
+            if os.path.exists(self.compacting_journal_path):
+                # left by a failed compaction, its records precede the new ones
+                with open(self.journal_path, 'rb') as journal, open(self.compacting_journal_path, 'ab') as compacting_journal:
+                    compacting_journal.write(journal.read())
+                os.remove(self.journal_path)
+            else:
+                os.replace(self.journal_path, self.compacting_journal_path)
+        self._writes_in_flight += 1
+        self._compaction_task = asyncio.ensure_future(self._finish_compaction(dump_data_in_background(self.snapshot(), self.file_path)))
+
+    async def _finish_compaction(self, write: Future) -> None:
+        try:
+            await asyncio.wrap_future(write)
+        except Exception:
+            # the records set aside are compacted again with the next ones
+            traceback.print_exc()
+            return
+        finally:
+            self._writes_in_flight -= 1
+        if os.path.exists(self.compacting_journal_path):
+            os.remove(self.compacting_journal_path)
+
+    def replay_journal(self) -> int:
+        """Apply the journal records on top of the content loaded from the file
+
+        A torn last record left by a crash is ignored and cut off the journal, so that the
+        records appended afterwards start on a line of their own. The records of an interrupted
+        compaction are replayed first, they may already be in the file and replaying them again
+        gives the same content.
+
+        Returns:
+            int: number of records applied
+        """
+        replayed = 0
+        for journal_path in (self.compacting_journal_path, self.journal_path):
+            if not os.path.exists(journal_path):
+                continue
+            valid_size = 0
+            with open(journal_path, 'rb') as file:
+                for line in file:
+                    if not line.endswith(b'\n'):
+                        break
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        break
+                    for mutation in (record[1] if record[0] == 'b' else (record,)):
+                        if mutation[0] == 's':
+                            dict.__setitem__(self, mutation[1], mutation[2])
+                        elif mutation[0] == 'd':
+                            dict.pop(self, mutation[1], None)
+                    replayed += 1
+                    valid_size += len(line)
+            if valid_size < os.path.getsize(journal_path):
+                os.truncate(journal_path, valid_size)
+        return replayed
+
+    def mark_dirty(self) -> None:
+        """Persist a mutation, immediately or by a scheduled flush in write-behind mode"""
+        if self.write_behind is None:
+            if in_event_loop():
+                # written through by the io thread pool, so that the event loop never waits for the disk
+                self._set_pending()
+                self._flush_in_background()
+            else:
+                self.sync()
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            # no event loop to flush later
+            self.sync()
+            return
+
+        now = time.monotonic()
+        if not self.dirty:
+            self.dirty = True
+            self._dirty_since = now
+            IODict._pending.add(self)
+        deadline = min(now + self.write_behind.flush_interval, self._dirty_since + self.write_behind.max_delay)
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+        self._flush_handle = loop.call_later(max(0.0, deadline - now), self._flush_in_background)
+
+    def _set_pending(self) -> None:
+        """Mark the dict dirty until its mutations are written, without scheduling a flush"""
+        if not self.dirty:
+            self.dirty = True
+            self._dirty_since = time.monotonic()
+            IODict._pending.add(self)
+
+    def _take_pending(self) -> bool:
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        if not self.dirty:
+            return False
+        self.dirty = False
+        IODict._pending.discard(self)
+        return True
+
+    def _flush_in_background(self) -> None:
+        self._flush_handle = None
+        self._flush_task = asyncio.ensure_future(self.flush_async())
+
+    def flush(self) -> None:
+        """Write pending mutations to the file, blocking until written
+
+        A background write still in flight writes an older snapshot, the file is rewritten so that
+        it is current once this returns, e.g. before an evicted dict is loaded again.
+        """
+        if self._take_pending() or self._writes_in_flight:
+            if not self.sync():
+                self._set_pending()
+
+    async def flush_async(self) -> None:
+        """Write pending mutations to the file on the io thread pool, they stay pending if the write fails"""
+        if not self._take_pending():
+            return
+        self._writes_in_flight += 1
+        try:
+            await asyncio.wrap_future(dump_data_in_background(self.snapshot(), self.file_path))
+        except Exception:
+            traceback.print_exc()
+            if self.write_behind is None:
+                # retried with the next mutation, or by flush at the latest
+                self._set_pending()
+            else:
+                # retried by the next scheduled flush, or by flush at the latest
+                self.mark_dirty()
+        finally:
+            self._writes_in_flight -= 1
+
+    def sync(self) -> bool:
+        """Write the whole dict to the file, blocking until it is on the disk"""
+        written = dump_data(data=self.to_serializable(), file_path=self.file_path)
+        if written and self.journal_max_size is not None:
+            # the file and its directory are fsynced and hold every journaled mutation now
+            for journal_path in (self.compacting_journal_path, self.journal_path):
+                if os.path.exists(journal_path):
+                    os.remove(journal_path)
+        return bool(written)
+
+    @classmethod
+    def flush_all(cls) -> None:
+        """Flush every write-behind dict with pending mutations"""
+        for d in list(IODict._pending):
+            d.flush()
+
+atexit.register(IODict.flush_all)
@@ -12,12 +12,41 @@
 @Desc      :    None
 '''
 
+import asyncio
+from concurrent.futures import Future, ThreadPoolExecutor
+import itertools
 import os
 import json
 import pickle
+import tempfile
+import threading
+import time
+from typing import Optional
 
 import traceback
 
+# optional faster or more compact encoders
+try:
+    import orjson
+except ImportError:
+    orjson = None
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+# disk writes run on this pool so that the event loop never waits for the disk
+io_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix='io')
+
+# every dump takes a sequence number when it is requested, a write older than the last one of its file is dropped
+_sequence = itertools.count()
+_written_sequences = {}
+_file_locks = {}
+_file_locks_lock = threading.Lock()
+
+# serialization and write duration per directory, a per file table would grow with every cached submission
+_io_stats = {}
+
 def exception_handler(func):
     def wrapper(*args, **kwargs):
         try:
@@ -25,7 +54,70 @@ def exception_handler(func):
         except Exception as e:
             traceback.print_exc()
     return wrapper
-            
+
+def in_event_loop() -> bool:
+    """Whether the caller runs on an event loop, where a blocking fsync would stall every other task"""
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return False
+    return True
+
+def _get_file_lock(file_path: str) -> threading.Lock:
+    with _file_locks_lock:
+        lock = _file_locks.get(file_path)
+        if lock is None:
+            lock = _file_locks[file_path] = threading.Lock()
+        return lock
+
+def forget(path: str) -> None:
+    """Drop the write bookkeeping of a removed file, or of every file under a removed directory
+
+    Args:
+        path (str): file or directory path
+    """
+    path = os.path.normpath(path)
+    prefix = path + os.sep
+    def is_under(other_path: str) -> bool:
+        other_path = os.path.normpath(other_path)
+        return other_path == path or other_path.startswith(prefix)
+
+    with _file_locks_lock:
+        for file_path in [file_path for file_path in _written_sequences if is_under(file_path)]:
+            del _written_sequences[file_path]
+        for file_path in [file_path for file_path in _file_locks if is_under(file_path)]:
+            # a write still holding the lock keeps it until it is done
+            if not _file_locks[file_path].locked():
+                del _file_locks[file_path]
+        for dir_path in [dir_path for dir_path in _io_stats if is_under(dir_path)]:
+            del _io_stats[dir_path]
+
+def _record_io_stats(file_path: str, size: int, serialize_time: float, write_time: float) -> None:
+    dir_path = os.path.dirname(file_path)
+    stats = _io_stats.setdefault(dir_path, {'count': 0, 'bytes': 0, 'serialize_time': 0.0, 'write_time': 0.0, 'max_write_time': 0.0})
+    stats['count'] += 1
+    stats['bytes'] += size
+    stats['serialize_time'] += serialize_time
+    stats['write_time'] += write_time
+    stats['max_write_time'] = max(stats['max_write_time'], write_time)
+
+def get_io_stats() -> dict:
+    """Get the dump statistics of every directory written to
+
+    Returns:
+        dict: directory path mapped to dump count, average size in bytes, average serialization and write time and max write time in seconds
+    """
+    return {
+        dir_path: {
+            'count': stats['count'],
+            'average_bytes': stats['bytes'] / stats['count'],
+            'average_serialize_time': stats['serialize_time'] / stats['count'],
+            'average_write_time': stats['write_time'] / stats['count'],
+            'max_write_time': stats['max_write_time']
+        }
+        for dir_path, stats in list(_io_stats.items())
+    }
+
 @exception_handler
 def load_data(file_path):
     _, ext = os.path.splitext(file_path)
@@ -33,36 +125,170 @@ def load_data(file_path):
         return load_json(file_path)
     elif ext == '.pkl':
         return load_pkl(file_path)
+    elif ext == '.msgpack':
+        return load_msgpack(file_path)
     else:
         raise ValueError(f"Unsupported file type: {ext}")
 
-@exception_handler
-def dump_data(data, file_path):
+def serialize_data(data, file_path) -> bytes:
     _, ext = os.path.splitext(file_path)
-    
+
     if ext == '.json':
-        return dump_json(data, file_path)
+        return serialize_json(data)
     elif ext == '.pkl':
-        return dump_pkl(data, file_path)
+        return pickle.dumps(data)
+    elif ext == '.msgpack':
+        return serialize_msgpack(data)
     else:
         raise ValueError(f"Unsupported file type: {ext}")
 
+def serialize_json(data, indent: Optional[int] = None) -> bytes:
+    """Serialize data to compact json, with orjson if it is installed
+
+    Like the json module, non string keys are written as strings.
+
+    Args:
+        data: data to serialize
+        indent (Optional[int], optional): indentation, compact if None. Defaults to None.
+
+    Returns:
+        bytes: utf-8 encoded json
+    """
+    if orjson is not None and indent in (None, 2):
+        option = orjson.OPT_NON_STR_KEYS
+        if indent is not None:
+            option |= orjson.OPT_INDENT_2
+        return orjson.dumps(data, option=option)
+    if indent is None:
+        return json.dumps(data, separators=(',', ':')).encode('utf-8')
+    return json.dumps(data, indent=indent).encode('utf-8')
+
+def serialize_msgpack(data) -> bytes:
+    if msgpack is None:
+        raise ValueError("Unsupported file type: .msgpack (msgpack is not installed)")
+    return msgpack.packb(data, use_bin_type=True)
+
+def fsync_dir(dir_path: str) -> None:
+    """Flush the entries of a directory to the disk, so that a replaced or created file survives a power loss"""
+    if not hasattr(os, 'O_DIRECTORY'):
+        # directories cannot be opened on windows, where a replace is durable once the file is
+        return
+    fd = os.open(dir_path, os.O_RDONLY | os.O_DIRECTORY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+def atomic_write(path, payload: bytes, fsync: bool = True) -> None:
+    """Replace a file so that readers and crashes see either the old or the new content
+
+    Args:
+        path (str): file path
+        payload (bytes): new file content
+        fsync (bool, optional): whether to flush the content and then the replace to the disk. Defaults to True.
+    """
+    dir_path = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(dir=dir_path, prefix=f'.{os.path.basename(path)}.', suffix='.tmp')
+    try:
+        # mkstemp creates the file readable by its owner only, keep the mode of the replaced file
+        os.chmod(tmp_path, os.stat(path).st_mode if os.path.exists(path) else 0o644)
+        with os.fdopen(fd, 'wb') as file:
+            file.write(payload)
+            if fsync:
+                file.flush()
+                os.fsync(file.fileno())
+        os.replace(tmp_path, path)
+        if fsync:
+            fsync_dir(dir_path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+def _write_payload(payload: bytes, file_path: str, sequence: int, serialize_time: float, fsync: bool) -> None:
+    with _get_file_lock(file_path):
+        if _written_sequences.get(file_path, -1) > sequence:
+            # a newer snapshot has already been written
+            return
+        start = time.perf_counter()
+        atomic_write(file_path, payload, fsync)
+        _written_sequences[file_path] = sequence
+        _record_io_stats(file_path, len(payload), serialize_time, time.perf_counter() - start)
+
+def _dump_snapshot(data, file_path: str, sequence: int, fsync: bool) -> bool:
+    start = time.perf_counter()
+    payload = serialize_data(data, file_path)
+    _write_payload(payload, file_path, sequence, time.perf_counter() - start, fsync)
+    return True
+
+@exception_handler
+def dump_data(data, file_path, fsync: bool = True) -> Optional[bool]:
+    return _dump_snapshot(data, file_path, next(_sequence), fsync)
+
+def dump_data_in_background(data, file_path, fsync: bool = True) -> Future:
+    """Serialize and write data on the io thread pool
+
+    The write is ordered with the other dumps of the file when this is called, not when the io
+    thread runs it.
+
+    Args:
+        data: snapshot to dump, serialized by the io thread so it must not be mutated anymore
+        file_path (str): file path
+        fsync (bool, optional): whether to flush the content to the disk before replacing. Defaults to True.
+
+    Returns:
+        Future: True once the data was written or superseded by a newer write, or the write error
+    """
+    return io_executor.submit(_dump_snapshot, data, file_path, next(_sequence), fsync)
+
+async def dump_data_async(data, file_path, fsync: bool = True) -> bool:
+    """Serialize data on the calling thread and write it on the io thread pool
+
+    Args:
+        data: data to dump, it may be mutated again as soon as this coroutine is awaited
+        file_path (str): file path
+        fsync (bool, optional): whether to flush the content to the disk before replacing. Defaults to True.
+
+    Returns:
+        bool: whether the data was written, or superseded by a newer write
+    """
+    sequence = next(_sequence)
+    try:
+        start = time.perf_counter()
+        payload = serialize_data(data, file_path)
+        serialize_time = time.perf_counter() - start
+        await asyncio.get_running_loop().run_in_executor(io_executor, _write_payload, payload, file_path, sequence, serialize_time, fsync)
+    except Exception:
+        traceback.print_exc()
+        return False
+    return True
+
 def load_pkl(path):
     with open(path, 'rb') as file:
         data = pickle.load(file)
     return data
 
 def dump_pkl(data, path):
-    with open(path, 'wb') as file:
-        pickle.dump(data, file)
+    atomic_write(path, pickle.dumps(data))
 
 
 def load_json(path):
+    if orjson is not None:
+        with open(path, 'rb') as file:
+            return orjson.loads(file.read())
     with open(path, 'r') as file:
         data = json.load(file)
     return data
 
-def dump_json(data, path, indent=4) -> dict:
-    with open(path, 'w') as file:
-        json.dump(data, file, indent=indent)
+def dump_json(data, path, indent=None) -> dict:
+    atomic_write(path, serialize_json(data, indent))
+
+def load_msgpack(path):
+    if msgpack is None:
+        raise ValueError("Unsupported file type: .msgpack (msgpack is not installed)")
+    with open(path, 'rb') as file:
+        # user ids are stored as integer keys
+        return msgpack.unpackb(file.read(), strict_map_key=False)
 
+def dump_msgpack(data, path):
+    atomic_write(path, serialize_msgpack(data))